@@ -21,6 +21,9 @@ class PhotoGenApp:
         
         self.secure_storage = SecureStorage()
         self.generator = Generator(self.config)
+        self.generator.resume_pending_jobs(self.secure_storage.load_api_key)  # Pick up jobs a previous run left running
+        self.generator.warmup.start()  # Optional background loading of the local pipelines
+        self.generator.tiled_output.start()  # Large-format output workers, started before the first mood shot needs them
         self.demo, self.ui, self.states = create_ui()
 
         self.i2i_handler = I2IHandler(self.ui, self.generator, self.secure_storage)
@@ -35,6 +38,20 @@ class PhotoGenApp:
             self.i2i_handler.register_event_handlers()
             self._register_api_key_handlers()
             self._register_additional_handlers()
+            self._register_warmup_status()
+
+    def _register_warmup_status(self):
+        """Show local pipeline warm-up progress until every configured pipeline has finished loading."""
+        warmup = self.generator.warmup
+        if not warmup.enabled or 'local_status' not in self.ui:
+            return
+        
+        def refresh_status():
+            return gr.update(value=warmup.status_markdown(), visible=True), gr.Timer(active=not warmup.finished)
+        
+        outputs = [self.ui['local_status'], self.ui['local_status_timer']]
+        self.demo.load(refresh_status, outputs=outputs)
+        self.ui['local_status_timer'].tick(refresh_status, outputs=outputs)
 
     def _register_additional_handlers(self):
         """Register additional handlers for saving and enhancement."""
@@ -204,10 +221,13 @@ class PhotoGenApp:
         
         return gr.update(label=label, value=saved_key)
 
-    def clear_all(self):
+    def clear_all(self, request: gr.Request = None):
         """Clear all state and reset the app to initial state."""
         logging.info("🗑️ Clearing all: resetting app state completely")
         
+        # Stop this session's running generation so its worker is released right away
+        self.generator.cancellations.cancel(request.session_hash if request is not None else None, "cleared")
+        
         # Import the default image function
         from core.ui import create_default_canvas_image
         
@@ -358,6 +378,13 @@ class PhotoGenApp:
         print("Alternative URL: http://127.0.0.1:7860")
         print("=" * 50)
         
+        webhooks = self.generator.webhooks
+        warmup = self.generator.warmup
+        routers = []
+        if webhooks.enabled:
+            routers.append(webhooks.create_router())  # Pro API completion callbacks
+        if warmup.enabled or self.generator.pipeline_manager.max_bytes:
+            routers.append(warmup.create_router())  # Local pipeline readiness and cache metrics
         self.demo.launch(
             server_name="0.0.0.0",
             server_port=7860,
@@ -365,8 +392,17 @@ class PhotoGenApp:
             share=False,
             show_error=True,
             quiet=True,  # Suppress Gradio's default URL output to avoid confusion
-            show_api=False
+            show_api=False,
+            prevent_thread_lock=bool(routers)  # Keep control so the extra routes can be mounted
         )
+        
+        if routers:
+            # Extra routes are served by the same server as the UI
+            for router in routers:
+                self.demo.app.include_router(router)
+            if webhooks.enabled:
+                logging.info(f"📬 Pro API webhooks enabled - callbacks via {webhooks.public_url}")
+            self.demo.block_thread()
 
 if __name__ == "__main__":
     app = PhotoGenApp()
@@ -0,0 +1,156 @@
+"""
+Compositing benchmark - single-canvas compositor vs the previous per-paste PIL implementations
+
+Runs the utils merge/layout functions on images from test_images/ twice: with the compositor
+(core.compositing.compose) and with the legacy PIL path it replaced (fresh
+Image.new canvas, one resize + paste per image, RGBA convert round trips for alpha pastes).
+Both produce the same layout; the benchmark checks the outputs are pixel-identical and
+reports time per call and the peak resident-memory growth of a fresh process running each
+variant (sampled from /proc, so Linux only).
+
+Usage:
+    python benchmarks/compositing.py [--runs 10] [--images test_images]
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from core import compositing  # noqa: E402
+from core import utils  # noqa: E402
+
+_engine_compose = compositing.compose
+
+
+def legacy_compose(size, tiles, background="black", resample=Image.LANCZOS, resize=None, workers=1):
+    """The PIL approach the utils functions used before the compositor"""
+    canvas = Image.new('RGB', size, color=background)
+    if any(tile.blend for tile in tiles):
+        canvas = canvas.convert('RGBA')
+    for tile in tiles:
+        image = tile.image
+        if image.size != tuple(tile.box[2:]):
+            image = image.resize(tuple(tile.box[2:]), resample)
+        if tile.blend:
+            image = image.convert('RGBA') if image.mode != 'RGBA' else image
+            canvas.paste(image, tuple(tile.box[:2]), image.getchannel('A'))
+        else:
+            canvas.paste(image, tuple(tile.box[:2]))
+    return canvas.convert('RGB')
+
+
+def _load_images(folder):
+    paths = sorted(glob.glob(os.path.join(folder, '*.png')) + glob.glob(os.path.join(folder, '*.jpg')))
+    if len(paths) < 4:
+        sys.exit(f"Need at least 4 images in {folder}")
+    images = [Image.open(path) for path in paths[:6]]
+    for image in images:
+        image.load()
+    return images
+
+
+def _cases(images):
+    """name -> zero-argument call of a utils function on the test images"""
+    rgba_object = images[1].convert('RGBA')
+    rgba_object.putalpha(Image.linear_gradient('L').resize(rgba_object.size))
+    small_object = rgba_object.resize((rgba_object.width // 3, rgba_object.height // 3))
+    return {
+        'merge_images_with_smart_scaling': lambda: utils.merge_images_with_smart_scaling(images[0], images[1], preserve_object_scale=True),
+        'merge_multiple (4 images)': lambda: utils.merge_multiple_images_high_quality(images[:4]),
+        'merge_multiple (6 images)': lambda: utils.merge_multiple_images_high_quality(images[:6]),
+        'create_side_by_side_display': lambda: utils.create_side_by_side_display(images[2], images[3]),
+        'paste_object (alpha)': lambda: utils.paste_object(images[0], small_object),
+    }
+
+
+def _use_engine(engine):
+    compositing.compose = _engine_compose if engine == 'engine' else legacy_compose
+    utils.configure_resize_cache({'resize_cache': {'cache_size_mb': 0}})  # Compare compositing, not resize caching
+
+
+def _time_cases(images, engine, runs):
+    _use_engine(engine)
+    timings = {}
+    for name, call in _cases(images).items():
+        call()  # Warm-up
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def _rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _child(folder, engine, runs):
+    """Run one variant in this (fresh) process and print its timings and peak-memory growth"""
+    images = _load_images(folder)
+    baseline = _rss_bytes()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.002):
+            peak[0] = max(peak[0], _rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    timings = _time_cases(images, engine, runs)
+    done.set()
+    sampler.join()
+    print(json.dumps({'timings': timings, 'peak_mb': (peak[0] - baseline) / 1024 / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='timed calls per function')
+    parser.add_argument('--images', default=os.path.join(REPO_ROOT, 'test_images'))
+    parser.add_argument('--child', choices=('engine', 'legacy'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.images, args.child, args.runs)
+        return
+
+    images = _load_images(args.images)
+    print(f"Compositing {len(images)} images from {args.images} ({args.runs} runs per function)")
+    for name, call in _cases(images).items():
+        _use_engine('engine')
+        new = np.asarray(call())
+        _use_engine('legacy')
+        old = np.asarray(call())
+        identical = new.shape == old.shape and np.array_equal(new, old)
+        print(f"  {name:<32} {'identical' if identical else 'DIFFERS'} output {new.shape[1]}×{new.shape[0]}")
+
+    results = {}
+    for engine in ('legacy', 'engine'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', engine, '--runs', str(args.runs), '--images', args.images],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        results[engine] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\n  {'function':<32} {'legacy':>9} {'engine':>9} {'speed-up':>9}")
+    for name, legacy in results['legacy']['timings'].items():
+        engine = results['engine']['timings'][name]
+        print(f"  {name:<32} {legacy * 1000:7.1f}ms {engine * 1000:7.1f}ms {legacy / engine:8.2f}x")
+    print(f"\n  peak memory growth: legacy {results['legacy']['peak_mb']:.0f} MB, engine {results['engine']['peak_mb']:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Latent-cache benchmark - Local Kontext edit latency with the conditioning-latent cache on and off
+
+Runs a sequence of edits on the same background through the Local image-to-image path (the
+way a user iterates on one photo), once with latent_cache disabled and once enabled, and
+reports per-edit latency. The first edit of the "on" run pays the VAE encode; later ones
+reuse the cached latents. Needs a CUDA machine with the GPU requirements installed.
+
+Usage:
+    python benchmarks/latent_cache.py [--image test_images/girl_model_1.png] [--edits 5] [--steps 8]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import yaml
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from core import constants as const  # noqa: E402
+from core.generator import Generator  # noqa: E402
+
+PROMPTS = [
+    "make the lighting warmer",
+    "add soft window light from the left",
+    "change the background wall to light grey",
+    "add a potted plant in the corner",
+    "make it look like golden hour",
+]
+
+
+def _run_edits(generator, source, args):
+    timings = []
+    for index in range(args.edits):
+        started = time.perf_counter()
+        asyncio.run(generator.image_to_image(
+            source, PROMPTS[index % len(PROMPTS)], args.steps, 2.5, const.LOCAL_MODEL, 1,
+            args.size, args.size, progress=None, seed=index, use_cache=False,
+        ))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(label, timings, cache=None):
+    line = f"{label:<10} first {timings[0]:6.2f}s  later median {statistics.median(timings[1:] or timings):6.2f}s"
+    if cache is not None:
+        stats = cache.stats()
+        line += f"  (hits {stats['hits']}, misses {stats['misses']})"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default=os.path.join(REPO_ROOT, 'test_images', 'girl_model_1.png'))
+    parser.add_argument('--edits', type=int, default=5, help='edits per run on the same background')
+    parser.add_argument('--steps', type=int, default=8, help='inference steps per edit')
+    parser.add_argument('--size', type=int, default=1024, help='generation width/height')
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, 'config.yaml'), 'r') as f:
+        config = yaml.safe_load(f)
+    config['local_batching'] = {'enabled': False}  # One request at a time - measure the edit itself
+
+    source = np.array(Image.open(args.image).convert('RGB'))
+    print(f"{args.edits} Local edits of {os.path.basename(args.image)} at {args.size}×{args.size}, {args.steps} steps")
+    generator = Generator(config)
+    if not generator.local_processing_available():
+        sys.exit("Local processing is not available on this machine (needs CUDA, diffusers and nunchaku)")
+    generator._load_local_i2i_pipeline()  # Keep the model load out of the timings
+    for label, cache_mb in (("cache off", 0), ("cache on", 256)):
+        generator.latent_cache.cache.max_bytes = int(cache_mb * 1024 * 1024)  # Same loaded pipeline for both runs
+        timings = _run_edits(generator, source, args)
+        _report(label, timings, generator.latent_cache.cache if cache_mb else None)
+
+
+if __name__ == '__main__':
+    main()
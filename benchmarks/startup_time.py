@@ -0,0 +1,80 @@
+"""
+Startup-time benchmark - cold import time of the app with and without the GPU stack
+
+Each sample runs in a fresh interpreter. The "without GPU stack" variant installs an import
+hook that makes torch/diffusers/nunchaku unimportable, the way they are on a CPU-only Pro
+deployment. The "with GPU stack" variant uses whatever is installed. Each run also reports
+whether torch ended up imported during startup (it should not - local_stack imports it lazily).
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--module app] [--with-local-stack]
+
+--with-local-stack also times importing the GPU stack itself (the cost moved to the first
+Local-model request).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r'''
+import json, sys, time
+if {block}:
+    import importlib.abc
+    class _BlockGpuStack(importlib.abc.MetaPathFinder):
+        def find_spec(self, name, path, target=None):
+            if name.split('.')[0] in ('torch', 'diffusers', 'nunchaku'):
+                raise ImportError(f"No module named '{{name}}' (blocked by benchmark)")
+            return None
+    sys.meta_path.insert(0, _BlockGpuStack())
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+stack_seconds = None
+if {with_local_stack}:
+    from core import local_stack
+    started = time.perf_counter()
+    local_stack.load()
+    stack_seconds = time.perf_counter() - started
+print(json.dumps({{'import': imported, 'torch_at_startup': 'torch' in sys.modules, 'local_stack': stack_seconds}}))
+'''
+
+
+def _sample(module, block, with_local_stack):
+    code = _CHILD.format(module=module, block=block, with_local_stack=with_local_stack)
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _report(label, samples):
+    imports = [sample['import'] for sample in samples]
+    line = f"{label:<22} median {statistics.median(imports):6.2f}s  min {min(imports):6.2f}s  max {max(imports):6.2f}s"
+    line += f"  torch imported at startup: {'yes' if any(s['torch_at_startup'] for s in samples) else 'no'}"
+    stack_times = [sample['local_stack'] for sample in samples if sample['local_stack'] is not None]
+    if stack_times:
+        line += f"  local stack load {statistics.median(stack_times):.2f}s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per variant')
+    parser.add_argument('--module', default='app', help='module whose import is timed (default: app)')
+    parser.add_argument('--with-local-stack', action='store_true', help='also time the lazy GPU stack import')
+    args = parser.parse_args()
+
+    print(f"Cold import of '{args.module}' ({args.runs} runs each, {sys.executable})")
+    _sample(args.module, False, False)  # Warm the OS file cache so the first sample is not an outlier
+    for label, block in (("with GPU stack", False), ("without GPU stack", True)):
+        samples = [_sample(args.module, block, args.with_local_stack) for _ in range(args.runs)]
+        _report(label, samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Batch Scheduler - Micro-batching of concurrent Local-model requests
+Requests with the same batch key (kind, size, steps, guidance, images per prompt) that arrive
+within a short window run as one pipeline call with a list of prompts; each caller gets its
+own slice of the images back
+"""
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class BatchRequest:
+    """One caller's share of a batched pipeline call"""
+
+    def __init__(self, prompt, num_images, seed=None, image=None, cancel_token=None):
+        self.prompt = prompt
+        self.num_images = int(num_images)
+        self.seed = seed
+        self.image = image  # Kontext input image (i2i only)
+        self.cancel_token = cancel_token
+        self.future = Future()
+
+
+class _Batch:
+    def __init__(self, key):
+        self.key = key
+        self.requests = []
+        self.images = 0
+        self.full = threading.Event()
+
+
+class BatchScheduler:
+    """Collects compatible Local requests for window_ms and runs them as one batch"""
+
+    def __init__(self, run_batch, config):
+        batch_config = config.get('local_batching', {}) or {}
+        self.enabled = bool(batch_config.get('enabled', True))
+        self.window = float(batch_config.get('window_ms', 50)) / 1000
+        self.max_batch_images = int(batch_config.get('max_batch_images', 4))
+        # run_batch(key, requests) -> one list of images per request, in order
+        self._run_batch = run_batch
+        self._open = {}  # key -> batch still accepting requests
+        self._lock = threading.Lock()
+
+    def submit(self, key, request):
+        """Run request in a batch of compatible requests and return its images"""
+        if not self.enabled or request.num_images >= self.max_batch_images:
+            return self._run_batch(key, [request])[0]
+
+        with self._lock:
+            batch = self._open.get(key)
+            is_leader = batch is None or batch.images + request.num_images > self.max_batch_images
+            if is_leader:
+                batch = _Batch(key)
+                self._open[key] = batch
+            batch.requests.append(request)
+            batch.images += request.num_images
+            if batch.images >= self.max_batch_images:
+                self._close(batch)
+
+        if is_leader:
+            self._lead(batch)
+        return self._wait(request)
+
+    def _close(self, batch):
+        """Stop accepting requests into batch (caller holds the lock)"""
+        if self._open.get(batch.key) is batch:
+            del self._open[batch.key]
+        batch.full.set()
+
+    def _lead(self, batch):
+        batch.full.wait(self.window)
+        with self._lock:
+            self._close(batch)
+            requests = list(batch.requests)
+
+        if len(requests) > 1:
+            logging.info(f"🧺 Running {len(requests)} Local requests as one batch ({batch.images} images)")
+        try:
+            results = self._run_batch(batch.key, requests)
+        except BaseException as e:
+            for request in requests:
+                request.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            for request, images in zip(requests, results):
+                request.future.set_result(images)
+
+    @staticmethod
+    def _wait(request):
+        while True:
+            try:
+                images = request.future.result(timeout=0.5)
+                break
+            except FutureTimeout:
+                # The batch keeps running for the others; a cancelled caller just stops waiting
+                if request.cancel_token is not None:
+                    request.cancel_token.raise_if_cancelled()
+        if request.cancel_token is not None:
+            request.cancel_token.raise_if_cancelled()
+        return images
@@ -0,0 +1,79 @@
+"""
+Byte-Budget LRU - Thread-safe in-memory LRU bounded by the total size of its values
+Shared building block for the process-wide caches (encoded inputs, embeddings, latents,
+resized images) so each one is capped in bytes rather than entry count
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+
+class ByteBudgetLRU:
+    """Least recently used entries are evicted once the stored values exceed max_bytes"""
+
+    def __init__(self, max_bytes, name="cache"):
+        self.max_bytes = int(max_bytes)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes), least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Store a value; values larger than the whole budget are not cached"""
+        nbytes = int(nbytes)
+        if not self.enabled or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                logging.debug(f"🧮 {self.name}: evicted {evicted_bytes / 1024 / 1024:.1f} MB entry")
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,133 @@
+"""
+Cancellation - Per-request cancel tokens and deadlines for generations
+Each browser session has at most one live generation: starting a different one supersedes
+the previous token, an identical one (e.g. a double click) runs alongside it and attaches to
+its job, "Clear All" cancels them, and every token carries the request's deadline
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from core import utils
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation whose token was cancelled (superseded or cleared)"""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag with a deadline and cancel callbacks"""
+
+    def __init__(self, deadline_seconds=None, request_key=None):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.request_key = request_key  # Identifies the inputs, so an identical request is not superseded
+        self.reason = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self):
+        """Seconds left until the deadline, or None when there is no deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logging.exception("🛑 Cancel callback failed")
+
+    def add_callback(self, callback):
+        """Call callback() on cancellation (immediately if already cancelled); returns a remover"""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self.reason is not None:
+            raise GenerationCancelled(self.reason)
+
+
+def make_request_key(*inputs):
+    """Content hash of a generation's UI inputs (images by fingerprint, everything else by value)"""
+    digest = hashlib.sha256()
+    for value in inputs:
+        if hasattr(value, 'tobytes'):  # PIL image or numpy array
+            value = utils.image_fingerprint(value)
+        digest.update(repr(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CancellationRegistry:
+    """Tracks the live generation tokens of each session"""
+
+    def __init__(self, config):
+        generation_config = config.get('generation', {}) or {}
+        self.deadline_seconds = float(generation_config.get('deadline_seconds', 300))
+        # Generate runs must be able to overlap, otherwise a new click would queue behind the one it supersedes.
+        # The handler is async, so a run waiting on a Pro job costs no worker thread
+        self.concurrency_limit = int(generation_config.get('concurrency_limit', 64))
+        self._tokens = {}  # session key -> CancelTokens of its running generation (several only for identical requests)
+        self._lock = threading.Lock()
+
+    def begin(self, session_key, request_key=None):
+        """Start a generation for a session, superseding the one it may still have running.
+
+        A request identical to the running one (same request_key) is not a new generation: it
+        keeps the running one alive and attaches to its job instead of paying for a second one.
+        """
+        token = CancelToken(self.deadline_seconds, request_key)
+        if session_key is None:
+            return token  # Not tied to a UI session - nothing to supersede
+        with self._lock:
+            running = [live for live in self._tokens.get(session_key, []) if not live.cancelled]
+            attach = bool(running) and request_key is not None and all(live.request_key == request_key for live in running)
+            superseded = [] if attach else running
+            self._tokens[session_key] = running + [token] if attach else [token]
+        if attach:
+            logging.info("🔗 Identical generation requested again - attaching to the running one")
+        elif superseded:
+            logging.info("🛑 New generation started - cancelling the previous one of this session")
+        for previous in superseded:
+            previous.cancel("superseded by a newer generation")
+        return token
+
+    def finish(self, session_key, token):
+        with self._lock:
+            tokens = self._tokens.get(session_key)
+            if tokens and token in tokens:
+                tokens.remove(token)
+                if not tokens:
+                    del self._tokens[session_key]
+
+    def cancel(self, session_key, reason="cancelled"):
+        with self._lock:
+            tokens = self._tokens.pop(session_key, [])
+        if tokens:
+            logging.info(f"🛑 Cancelling running generation ({reason})")
+        for token in tokens:
+            token.cancel(reason)
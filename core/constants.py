@@ -7,6 +7,7 @@ T2I_MODE = "Create a New Image (Text-to-Image)"
 # --- Model Selection ---
 LOCAL_MODEL = "Local"
 PRO_MODEL = "Pro"
+PRO_AUTO_MODEL = "Pro (Auto)"  # Routes each job to the fastest healthy provider
 
 # --- API Provider & Key Names ---
 FLUX_PRO_API = "Black Forest Labs API"  # Renamed for clarity
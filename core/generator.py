@@ -1,124 +1,237 @@
 import gradio as gr
 
-# Conditional imports for GPU/local processing dependencies
-TORCH_AVAILABLE = False
-DIFFUSERS_AVAILABLE = False
-CUDA_AVAILABLE = False
-LOCAL_PROCESSING_AVAILABLE = False
-
-try:
-    import torch
-    TORCH_AVAILABLE = True
-    CUDA_AVAILABLE = torch.cuda.is_available()
-    print(f"✅ PyTorch available - GPU processing {'possible' if CUDA_AVAILABLE else 'not available (CPU-only)'}")
-except ImportError as e:
-    print(f"⚠️ PyTorch not available: {e}")
-    torch = None
-
-# Conditional imports for local FLUX pipelines (only needed for GPU/local processing)
-try:
-    from diffusers import FluxPipeline, FluxKontextPipeline
-    DIFFUSERS_AVAILABLE = True
-    print("✅ Diffusers with FLUX pipelines available")
-except ImportError as e:
-    print(f"⚠️ FLUX pipelines not available: {e}")
-    print("🔄 Running in API-only mode - Local processing disabled")
-    DIFFUSERS_AVAILABLE = False
-    # Placeholder classes for API-only mode
-    class FluxPipeline:
-        pass
-    class FluxKontextPipeline:
-        pass
-
-# Local processing is only available if we have both torch with CUDA and diffusers
-LOCAL_PROCESSING_AVAILABLE = TORCH_AVAILABLE and DIFFUSERS_AVAILABLE and CUDA_AVAILABLE
-
-if LOCAL_PROCESSING_AVAILABLE:
-    print("🚀 Local GPU processing enabled")
-else:
-    print("📡 Running in API-only mode")
-
-# Conditional imports for Nunchaku optimization (only needed for GPU processing)
-try:
-    from nunchaku import NunchakuFluxTransformer2dModel
-    from nunchaku.utils import get_precision
-    NUNCHAKU_AVAILABLE = True
-    print("✅ Nunchaku optimization available")
-except ImportError as e:
-    print(f"⚠️ Nunchaku not available: {e}")
-    NUNCHAKU_AVAILABLE = False
-    # Placeholder classes
-    class NunchakuFluxTransformer2dModel:
-        pass
-    def get_precision():
-        return "fp16"
+# torch/diffusers/nunchaku are imported lazily by core.local_stack on the first Local-model request,
+# so Pro-only (CPU) deployments start without them
 from PIL import Image
 import numpy as np
-import requests
-import base64
+import httpx
+import asyncio
 from io import BytesIO
 import time
 import logging
 import math
+import contextlib
+import random
+from concurrent.futures import CancelledError
 from core import constants as const
 from core import utils
+from core import local_stack
+from core.pro_client import ProApiClient, DownloadTooLarge
+from core.job_poller import JobPoller
+from core.webhooks import WebhookReceiver
+from core.result_cache import ResultCache
+from core.single_flight import SingleFlight
+from core.job_journal import JobJournal, STATUS_COMPLETED, STATUS_FAILED, STATUS_EXPIRED
+from core.rate_limiter import RateLimiter, RateLimitExceeded
+from core.provider_router import ProviderRouter
+from core.image_encoding import ImageEncoder
+from core.payload_stream import Base64Blob
+from core.cancellation import CancellationRegistry, GenerationCancelled
+from core.warmup import PipelineWarmup
+from core.pipeline_manager import PipelineManager
+from core.batch_scheduler import BatchScheduler, BatchRequest
+from core.prompt_embeddings import PromptEmbeddingCache
+from core.latent_cache import LatentCache
+from core.tiled_output import TiledOutput
 
 class Generator:
-    def __init__(self, config):
+    def __init__(self, config, pipeline_loaders=None):
         self.config = config
-        self.pipeline = None
-        self.kontext_pipeline = None
-        # Lazy loading - only load when actually needed for better startup time
+        self.pro_client = ProApiClient(config)  # Shared connection pools for all Pro API jobs
+        self.job_poller = JobPoller(self.pro_client, config)  # One poller for every in-flight job
+        self.webhooks = WebhookReceiver(config)  # Opt-in completion callbacks instead of polling
+        self.result_cache = ResultCache(config)  # Identical requests are served from disk
+        self.in_flight = SingleFlight("generation")  # Identical concurrent requests share one job
+        self.job_journal = JobJournal(config)  # Submitted jobs survive restarts
+        self.rate_limiter = RateLimiter(config)  # Per-provider admission queue
+        self.provider_router = ProviderRouter(config)  # Latency stats behind the "Pro (Auto)" choice
+        self.image_encoder = ImageEncoder(config)  # Compressed, cached Pro API input images
+        self.cancellations = CancellationRegistry(config)  # Live generation token per UI session
+        self._resumed_jobs = {}  # request_key -> Future of a job resumed from the journal
+        # Lazy loading - the GPU stack and pipelines are only imported/loaded when actually needed.
+        # Loaders map 't2i'/'i2i' to a factory(shared_components) and can be injected (e.g. stub pipelines on CPU)
+        self._custom_loaders = pipeline_loaders is not None
+        self.pipeline_loaders = pipeline_loaders or {
+            't2i': self._build_local_t2i_pipeline,
+            'i2i': self._build_local_i2i_pipeline,
+        }
+        # Memory-budgeted pipeline cache; T2I and Kontext share text encoders/VAE when built from the same model
+        self.pipeline_manager = PipelineManager(config, self.pipeline_loaders, sources={
+            't2i': config['models']['text_to_image'],
+            'i2i': config['models']['image_to_image'],
+        })
+        self.warmup = PipelineWarmup(self._load_local_pipeline, config, metrics=self.pipeline_manager.metrics)
+        self.batch_scheduler = BatchScheduler(self._run_local_batch, config)  # Concurrent Local requests share a pipeline call
+        self.prompt_embeddings = PromptEmbeddingCache(config)  # Repeated prompts skip the text encoders
+        self.latent_cache = LatentCache(config)  # Repeated Kontext edits of one background skip the VAE encode
+        utils.configure_resize_cache(config)  # Process-wide memo of LANCZOS resizes of the same background
+        utils.configure_reference_sheet(config)  # Pixel budget and threads of multi-image reference sheets
+        self.tiled_output = TiledOutput(config)  # Large product sizes are resized in strips off-process, straight to PNG
+
+    def local_processing_available(self):
+        """True when Local-model requests can run (always with injected pipeline loaders)"""
+        return self._custom_loaders or local_stack.local_processing_available()
+
+    @property
+    def pipeline(self):
+        return self.pipeline_manager.peek('t2i')
+
+    @property
+    def kontext_pipeline(self):
+        return self.pipeline_manager.peek('i2i')
+
+    def _load_local_pipeline(self, kind):
+        """Return the local pipeline for kind, loading it once even when several requests race for it"""
+        return self.pipeline_manager.get(kind)
+
+    def _pipeline_lease(self, kind):
+        """Pin a local pipeline (loading it if needed) for one run; runs on the same pipeline are serialized"""
+        return self.pipeline_manager.lease(kind)
+
+    def unload_local_pipeline(self, kind):
+        """Drop a local pipeline unless a request holds it or is loading it; returns True if unloaded"""
+        if not self.pipeline_manager.unload(kind):
+            return False
+        logging.info(f"🧹 Unloaded local {kind} pipeline")
+        return True
 
     def _load_local_t2i_pipeline(self):
-        if not LOCAL_PROCESSING_AVAILABLE:
+        return self._load_local_pipeline('t2i')
+
+    def _load_local_i2i_pipeline(self):
+        return self._load_local_pipeline('i2i')
+
+    def _build_local_t2i_pipeline(self, shared=None):
+        stack = local_stack.load()
+        if not stack.local_processing_available:
             logging.error("🚫 Local FLUX pipelines not available - API-only mode (no GPU/CUDA support)")
             return None
             
-        if self.pipeline is None:
-            logging.info("Loading FLUX.1 (Text-to-Image) pipeline...")
-            DTYPE = torch.bfloat16
-            self.pipeline = FluxPipeline.from_pretrained(
-                self.config['models']['text_to_image'], torch_dtype=DTYPE
-            )
-            self.pipeline.enable_model_cpu_offload()
-            logging.info("✅ FLUX.1 T2I pipeline configured.")
-        return self.pipeline
+        logging.info("Loading FLUX.1 (Text-to-Image) pipeline...")
+        DTYPE = stack.torch.bfloat16
+        pipeline = stack.FluxPipeline.from_pretrained(
+            self.config['models']['text_to_image'], torch_dtype=DTYPE, **(shared or {})
+        )
+        pipeline.enable_model_cpu_offload()
+        logging.info("✅ FLUX.1 T2I pipeline configured.")
+        return pipeline
 
-    def _load_local_i2i_pipeline(self):
-        if not LOCAL_PROCESSING_AVAILABLE:
+    def _build_local_i2i_pipeline(self, shared=None):
+        stack = local_stack.load()
+        if not stack.local_processing_available:
             logging.error("🚫 Local FLUX pipelines not available - API-only mode (no GPU/CUDA support)")
             return None
             
-        if self.kontext_pipeline is None:
-            logging.info("Loading FLUX.1 Kontext (Image-to-Image) pipeline...")
-            try:
-                if not NUNCHAKU_AVAILABLE:
-                    logging.error("🚫 Nunchaku not available - cannot load I2I pipeline")
-                    self.kontext_pipeline = None
-                    return None
-                    
-                DTYPE = torch.bfloat16
-                torch.set_float32_matmul_precision('high')
-                nunchaku_path = self.config['models']['nunchaku_transformer'].format(precision=get_precision())
-                
-                logging.info("Loading Nunchaku transformer...")
-                transformer = NunchakuFluxTransformer2dModel.from_pretrained(nunchaku_path, torch_dtype=DTYPE)
-                logging.info("✅ Nunchaku transformer loaded.")
+        logging.info("Loading FLUX.1 Kontext (Image-to-Image) pipeline...")
+        try:
+            if not stack.nunchaku_available:
+                logging.error("🚫 Nunchaku not available - cannot load I2I pipeline")
+                return None
                 
-                self.kontext_pipeline = FluxKontextPipeline.from_pretrained(
-                    self.config['models']['image_to_image'], transformer=transformer, torch_dtype=DTYPE
-                )
-                self.kontext_pipeline.enable_model_cpu_offload()
-                logging.info("✅ FLUX.1 Kontext I2I pipeline configured.")
-            except Exception:
-                logging.error("🔥 FATAL ERROR: Could not load local models.", exc_info=True)
-                self.kontext_pipeline = None
-        return self.kontext_pipeline
-        
+            DTYPE = stack.torch.bfloat16
+            stack.torch.set_float32_matmul_precision('high')
+            nunchaku_path = self.config['models']['nunchaku_transformer'].format(precision=stack.get_precision())
+            
+            logging.info("Loading Nunchaku transformer...")
+            transformer = stack.NunchakuFluxTransformer2dModel.from_pretrained(nunchaku_path, torch_dtype=DTYPE)
+            logging.info("✅ Nunchaku transformer loaded.")
+            
+            kontext_pipeline = stack.FluxKontextPipeline.from_pretrained(
+                self.config['models']['image_to_image'], transformer=transformer, torch_dtype=DTYPE, **(shared or {})
+            )
+            kontext_pipeline.enable_model_cpu_offload()
+            logging.info("✅ FLUX.1 Kontext I2I pipeline configured.")
+            return kontext_pipeline
+        except Exception:
+            logging.error("🔥 FATAL ERROR: Could not load local models.", exc_info=True)
+            return None
+
+    def _inference_mode(self):
+        """torch.inference_mode() when torch is present (stub pipelines may run without it)"""
+        torch = local_stack.load().torch
+        return torch.inference_mode() if torch is not None else contextlib.nullcontext()
+
+    def _step_callback(self, *cancel_tokens):
+        """callback_on_step_end that stops a local pipeline between steps once all its requests are cancelled"""
+        if not cancel_tokens or any(token is None for token in cancel_tokens):
+            return None
+
+        def check_cancelled(pipeline, step, timestep, callback_kwargs):
+            if all(token.cancelled for token in cancel_tokens):
+                cancel_tokens[0].raise_if_cancelled()
+            if all(token.expired for token in cancel_tokens):
+                raise gr.Error("⏰ Generation exceeded its time limit and was stopped.")
+            return callback_kwargs
+        return check_cancelled
+
+    def _seeded_generator(self, seed):
+        """torch.Generator for reproducible local generations, or None for a random seed"""
+        if seed is None:
+            return None
+        torch = local_stack.load().torch
+        if torch is None:
+            return None
+        return torch.Generator("cpu").manual_seed(int(seed))
+
+    def _batch_generators(self, requests):
+        """One torch.Generator per image (seed, seed+1, ... per request; random when unseeded), or None without torch.
+
+        Used whether or not a request was batched, so a seeded request gives the same images either way.
+        """
+        generators = []
+        for request in requests:
+            base = int(request.seed) if request.seed is not None else random.randrange(2 ** 32)
+            generators.extend(self._seeded_generator(base + i) for i in range(request.num_images))
+        return generators if any(generator is not None for generator in generators) else None
+
+    def _run_local_batch(self, key, requests):
+        """Run one pipeline call for a batch of compatible Local requests; returns their images in order"""
+        kind, width, height, steps, guidance, num_images = key
+        single = len(requests) == 1
+        with self._pipeline_lease(kind) as pipeline:
+            if pipeline is None:
+                if kind == 't2i':
+                    raise gr.Error("Local Text-to-Image pipeline could not be loaded. Try using 'Pro' models for API-based generation.")
+                raise gr.Error("Local Image-to-Image pipeline could not be loaded.")
+            kwargs = dict(
+                num_inference_steps=steps,
+                guidance_scale=guidance,
+                generator=self._batch_generators(requests),
+                callback_on_step_end=self._step_callback(*(request.cancel_token for request in requests))
+            )
+            with self._inference_mode():
+                prompt_kwargs = self.prompt_embeddings.pipeline_kwargs(pipeline, [request.prompt for request in requests], num_images)
+            kwargs.update(prompt_kwargs or dict(
+                prompt=requests[0].prompt if single else [request.prompt for request in requests],
+                num_images_per_prompt=num_images,
+            ))
+            conditioning = contextlib.nullcontext()
+            if kind == 't2i':
+                kwargs.update(width=width, height=height)
+            else:
+                if single:
+                    kwargs['image'] = requests[0].image
+                else:
+                    # One input image per output image, so Kontext pairs each prompt with its own image
+                    kwargs['image'] = [request.image for request in requests for _ in range(num_images)]
+                rows = kwargs['image'] if isinstance(kwargs['image'], list) else [kwargs['image']]
+                conditioning = self.latent_cache.conditioning(pipeline, rows)
+            with self._inference_mode(), conditioning:
+                images = pipeline(**kwargs).images
+        return [images[i * num_images:(i + 1) * num_images] for i in range(len(requests))]
+
+    @staticmethod
+    def _single_image_input(source_image_np, background_img, size):
+        """PIL input of a single-image edit: the upload's full-resolution pixels when its reduced decode is too small for size"""
+        if background_img is not None:
+            source = utils.source_for_size(background_img, size)
+            if source is not background_img:
+                return source
+        return Image.fromarray(source_image_np)
+
     def _determine_safe_generation_size(self, background_img, aspect_ratio_setting, model_choice, force_aspect_ratio=False):
         """Simplified dimension selection with safety checks
-        
+
         Args:
             background_img: Background image or None
             aspect_ratio_setting: UI aspect ratio selection
@@ -128,14 +241,14 @@ class Generator:
         # Always use aspect ratio setting when requested or no background
         if background_img is None or force_aspect_ratio or aspect_ratio_setting != "Match Input":
             return utils.get_dimensions(aspect_ratio_setting)
-        
-        # Only use background dimensions for "Match Input" mode
-        bg_size = background_img.size
+
+        # Only use background dimensions for "Match Input" mode (the upload's size, even if decoded reduced)
+        bg_size = utils.original_size(background_img)
         bg_pixels = bg_size[0] * bg_size[1]
         bg_ratio = bg_size[0] / bg_size[1]
-        
+
         logging.info(f"🔍 Background: {bg_size[0]}×{bg_size[1]} ({bg_pixels:,} pixels, ratio: {bg_ratio:.2f})")
-        
+
         # Set limits based on model choice
         if model_choice == const.PRO_MODEL:
             MAX_PIXELS = 2048 * 2048
@@ -146,7 +259,7 @@ class Generator:
             
         MIN_PIXELS = 512 * 512
         MIN_RATIO, MAX_RATIO = 0.3, 3.5
-        
+
         # Check if we can use original size
         if (bg_pixels <= MAX_PIXELS and 
             bg_size[0] <= MAX_DIM and bg_size[1] <= MAX_DIM and
@@ -154,12 +267,12 @@ class Generator:
             bg_pixels >= MIN_PIXELS):
             logging.info(f"✅ Using original size: {bg_size[0]}×{bg_size[1]}")
             return bg_size
-        
+
         # Handle extreme aspect ratios
         if not (MIN_RATIO <= bg_ratio <= MAX_RATIO):
             logging.warning(f"⚠️ Extreme aspect ratio {bg_ratio:.2f}, using fallback dimensions")
             return utils.get_dimensions(aspect_ratio_setting)
-        
+
         # Scale down if too large, scale up if too small
         if bg_pixels > MAX_PIXELS or max(bg_size) > MAX_DIM:
             scale_factor = min(math.sqrt(MAX_PIXELS / bg_pixels), MAX_DIM / max(bg_size))
@@ -171,7 +284,7 @@ class Generator:
         # Apply scaling and ensure multiple of 64
         new_width = max(512, ((int(bg_size[0] * scale_factor) + 63) // 64) * 64)
         new_height = max(512, ((int(bg_size[1] * scale_factor) + 63) // 64) * 64)
-        
+
         logging.info(f"📐 Scaled: {bg_size[0]}×{bg_size[1]} → {new_width}×{new_height}")
         return (new_width, new_height)
     
@@ -182,11 +295,11 @@ class Generator:
             
         bg_area = background_size[0] * background_size[1]
         obj_area = object_size[0] * object_size[1]
-        
+
         # Base scale: object should be reasonable size relative to background
         # Start with 15% of background area as default
         target_area_ratio = 0.15
-        
+
         # Adjust based on background aspect ratio
         bg_ratio = background_size[0] / background_size[1]
         if bg_ratio > 2.5:  # Very wide background (panorama style)
@@ -197,13 +310,13 @@ class Generator:
         # Calculate scale factor to achieve target area
         target_area = bg_area * target_area_ratio
         scale_factor = math.sqrt(target_area / obj_area)
-        
+
         # Clamp scale factor to reasonable bounds
         scale_factor = max(0.1, min(scale_factor, 2.0))  # Don't shrink below 10% or grow above 200%
-        
+
         new_width = int(object_size[0] * scale_factor)
         new_height = int(object_size[1] * scale_factor)
-        
+
         # Ensure minimum viable size
         if new_width < 64 or new_height < 64:
             min_scale = max(64 / object_size[0], 64 / object_size[1])
@@ -212,124 +325,410 @@ class Generator:
             
         logging.info(f"🎯 Object scaled from {object_size[0]}×{object_size[1]} to {new_width}×{new_height} (scale: {scale_factor:.2f})")
         return (new_width, new_height)
-        
-    def _call_pro_api(self, payload, api_config_key, progress):
+
+    async def _call_pro_api(self, payload, api_config_key, progress, megapixels=None, provider_name=const.FLUX_PRO_API, cancel_token=None):
         """Helper function to call the Pro API, poll for results, and return images."""
+        jobs = [(self._make_pro_job(job_payload, api_config_key, megapixels, provider_name), job_payload)
+                for job_payload in self._fan_out_payloads(payload)]
+
+        # The jobs run on the shared client loop; the request only awaits them and relays progress
+        runners = [lambda report, job=job, job_payload=job_payload: self._run_tracked_job(job, job_payload, report)
+                   for job, job_payload in jobs]
+        return await self._run_on_client(lambda report: self._run_fan_out(runners, report), progress, cancel_token)
+
+    async def _run_on_client(self, coro_fn, progress, cancel_token=None):
+        """Await a job on the Pro API client loop, bounded by the request's cancel token and deadline."""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        try:
+            return await self.pro_client.run(coro_fn, progress, cancel_token)
+        except (CancelledError, asyncio.CancelledError):
+            if cancel_token is not None and cancel_token.cancelled:
+                logging.info(f"🛑 Pro API job cancelled ({cancel_token.reason}) - worker released")
+                raise GenerationCancelled(cancel_token.reason)
+            raise
+        except asyncio.TimeoutError:
+            if cancel_token is not None and cancel_token.expired:
+                logging.error("⏰ Pro API job exceeded the request deadline")
+                raise gr.Error("⏰ Generation exceeded its time limit and was stopped. Please try again.")
+            raise
+
+    def _fan_out_payloads(self, payload):
+        """Split a request for N images into N single-image jobs with consecutive seeds.
+
+        The providers return one sample per job. The copies share the encoded input image string.
+        """
+        num_images = int(payload.get('num_images_per_prompt', 1) or 1)
+        if num_images <= 1:
+            return [payload]
+        base_seed = payload.get('seed')
+        if base_seed is None:
+            base_seed = random.randrange(2**31)  # Distinct seeds so the N results differ
+        logging.info(f"🪭 Fanning out {num_images} images as concurrent jobs (seeds {base_seed}-{base_seed + num_images - 1})")
+        return [dict(payload, num_images_per_prompt=1, seed=base_seed + i) for i in range(num_images)]
+
+    async def _run_fan_out(self, runners, report):
+        """Run the jobs of one request concurrently and return all of their images in order.
+
+        Each runner takes a report callable and returns a job coroutine. Progress is the mean over
+        jobs. If any job fails the others are cancelled.
+        """
+        if len(runners) == 1:
+            return await runners[0](report)
+
+        fractions = [0.0] * len(runners)
+
+        def job_report(index):
+            def relay(fraction, desc=None):
+                fractions[index] = fraction
+                report(sum(fractions) / len(fractions), f"{desc or 'Generating'} ({len(runners)} images)")
+            return relay
+
+        tasks = [asyncio.ensure_future(runner(job_report(i))) for i, runner in enumerate(runners)]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return [img for images in results for img in images]
+
+    def _make_pro_job(self, payload, api_config_key, megapixels, provider_name):
+        """Resolve the provider config for a payload into the per-job context (pops the API key)."""
         api_config = self.config.get('api_models', {}).get(api_config_key, {})
         api_base = api_config.get('api_base')
         endpoint = api_config.get('endpoint')
-        
+
         if not api_base or not endpoint:
             raise gr.Error(f"Your config.yaml is missing API configuration for '{api_config_key}'.")
 
         full_endpoint = f"{api_base}{endpoint}"
         api_key = payload.pop("api_key", "")
-        
+
         logging.info(f"🔑 API Call Debug - Config key: {api_config_key}")
         logging.info(f"🔑 API Base: {api_base}")
         logging.info(f"🔑 Endpoint: {endpoint}")
         logging.info(f"🔑 API Key received: {'✅ Found' if api_key else '❌ Empty'}")
-        
+
         # Both providers use the same authentication method (Flux API compatible)
         headers = {"x-key": api_key, "Content-Type": "application/json"}
         logging.info("🔑 Using Flux-compatible authentication (x-key header)")
-        
+
+        return {
+            'config_key': api_config_key,
+            'provider_name': provider_name,
+            'api_base': api_base,
+            'endpoint': full_endpoint,
+            'headers': headers,
+            'api_key': api_key,
+            'megapixels': megapixels,
+            'request_key': self.job_journal.request_key(api_config_key, payload),
+        }
+
+    async def _call_pro_api_auto(self, payload, kind, progress, megapixels=None, cancel_token=None):
+        """Route a Pro API job to the best provider the user has a key for ("Pro (Auto)").
+
+        payload['api_key'] maps provider names to keys; kind is 't2i' or 'i2i'.
+        """
+        api_keys = payload.pop("api_key", None) or {}
+        providers = []
+        for model_choice in ("Pro (Black Forest Labs)", "Pro (GRS AI)"):
+            provider_info = self._get_pro_provider_info(model_choice)
+            if api_keys.get(provider_info['provider_name']):
+                providers.append(provider_info)
+
+        if not providers:
+            raise gr.Error("Pro (Auto) needs an API key for at least one Pro provider. Add one in the API key settings.")
+
+        ranking = self.provider_router.rank([provider_info['provider_name'] for provider_info in providers])
+        providers.sort(key=lambda provider_info: ranking.index(provider_info['provider_name']))
+        logging.info(f"🧭 Auto routing to {providers[0]['provider_name']}")
+
+        runners = []
+        for job_payload in self._fan_out_payloads(payload):
+            candidates = []
+            for provider_info in providers:
+                config_key = provider_info[f'{kind}_config_key']
+                candidate_payload = dict(
+                    job_payload, api_key=api_keys[provider_info['provider_name']],
+                    model=self.config.get('api_models', {}).get(config_key, {}).get('model_name')
+                )
+                job = self._make_pro_job(candidate_payload, config_key, megapixels, provider_info['provider_name'])
+                candidates.append((job, candidate_payload))
+            runners.append(lambda report, candidates=candidates: self._run_routed_job(candidates, report))
+        return await self._run_on_client(lambda report: self._run_fan_out(runners, report), progress, cancel_token)
+
+    async def _run_routed_job(self, candidates, report):
+        """Run on the best provider; fail over to the next one, or hedge to it past the tail latency.
+
+        Whichever provider answers first wins and the other job is cancelled.
+        """
+        primary_job, primary_payload = candidates[0]
+        fallbacks = list(candidates[1:])
+        started = {}  # task -> (provider name, start time), to score a hedge loser's elapsed time
+
+        def start(job, payload):
+            task = asyncio.ensure_future(self._run_tracked_job(job, payload, report))
+            started[task] = (job['provider_name'], time.monotonic())
+            return task
+
+        tasks = {start(primary_job, primary_payload)}
+        hedge_after = self.provider_router.hedge_after(primary_job['provider_name']) if fallbacks else None
+        errors = []
         try:
-            progress(0, desc="Sending request to Pro API...")
-            logging.info(f"🌐 === API REQUEST DEBUG ===")
-            logging.info(f"🌐 Full Endpoint: {full_endpoint}")
-            logging.info(f"🌐 Request Headers: {headers}")
-            logging.info(f"🌐 Payload Keys: {list(payload.keys())}")
-            logging.info(f"🌐 Payload Model: {payload.get('model', 'Unknown')}")
-            logging.info(f"🌐 Payload Steps: {payload.get('num_inference_steps', 'Unknown')}")
-            logging.info(f"🌐 Payload Guidance: {payload.get('guidance_scale', 'Unknown')}")
-            
-            post_response = requests.post(full_endpoint, headers=headers, json=payload, timeout=120)
-            post_response.raise_for_status()
-            
-            logging.info(f"🌐 Response Status: {post_response.status_code}")
-            logging.info(f"🌐 Response Content Preview: {post_response.text[:500]}...")
-            logging.info(f"🌐 === END API REQUEST DEBUG ===")
-            
-            polling_url = post_response.json().get('polling_url')
-            if not polling_url:
-                raise gr.Error(f"API did not return a polling URL. Response: {post_response.text}")
-        except requests.exceptions.Timeout:
-            logging.error("⏰ API Request Timeout - Server took too long to respond")
-            raise gr.Error("⏰ API Timeout: The server is taking too long to respond. Please try again in a moment, or consider switching to a different model provider.")
-        except requests.exceptions.HTTPError as e:
-            response_text = e.response.text if e.response else "N/A"
-            status_code = e.response.status_code if e.response else "Unknown"
-            
-            if status_code == 504:
-                logging.error("🚪 Gateway Timeout (504) - API server is overloaded or unavailable")
-                raise gr.Error("🚪 Server Timeout (504): The API server is currently overloaded or temporarily unavailable. Please try again in a few minutes, or switch to 'Pro (Black Forest Labs)' model.")
-            elif status_code == 503:
-                logging.error("🔧 Service Unavailable (503) - API server is down for maintenance")  
-                raise gr.Error("🔧 Service Unavailable (503): The API server is temporarily down for maintenance. Please try again later or use a different model.")
-            elif status_code == 429:
-                logging.error("⚡ Rate Limited (429) - Too many requests")
-                raise gr.Error("⚡ Rate Limited (429): Too many requests. Please wait a moment before trying again.")
-            else:
-                logging.error(f"❌ HTTP Error {status_code}: {e}")
-                raise gr.Error(f"❌ API Error ({status_code}): {e}\n\nTry switching to 'Pro (Black Forest Labs)' model or try again later.")
-        except requests.exceptions.ConnectionError:
-            logging.error("🌐 Connection Error - Cannot reach API server")
-            raise gr.Error("🌐 Connection Error: Cannot reach the API server. Please check your internet connection and try again.")
-        except requests.exceptions.RequestException as e:
-            response_text = e.response.text if e.response else "N/A"
-            logging.error("❌ API Request Error", exc_info=True)
-            raise gr.Error(f"❌ API Request Error: {e}\n\nResponse: {response_text}\n\nTry switching to a different model provider.")
-        
-        # Polling loop with improved error handling
-        for i in range(25):
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done and not fallbacks:
+                    hedge_after = None
+                    continue
+                if not done:
+                    # Tail latency exceeded: race the runner-up against the job still running
+                    hedge_after = None
+                    job, payload = fallbacks.pop(0)
+                    logging.info(f"🧭 {primary_job['provider_name']} past its p{self.provider_router.hedge_percentile:.0f} latency - hedging to {job['provider_name']}")
+                    tasks.add(start(job, payload))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        # The jobs still running lost the hedge: they took at least this long
+                        for loser in tasks:
+                            provider_name, loser_started = started[loser]
+                            self.provider_router.record_abandoned(provider_name, time.monotonic() - loser_started)
+                        return task.result()
+                    errors.append(task.exception())
+                if not tasks and fallbacks:
+                    hedge_after = None
+                    job, payload = fallbacks.pop(0)
+                    logging.warning(f"🧭 Provider failed ({errors[-1]}) - failing over to {job['provider_name']}")
+                    report(0, f"Retrying on {job['provider_name']}...")
+                    tasks.add(start(job, payload))
+            raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _run_tracked_job(self, job, payload, report):
+        """Run a Pro API job and feed its latency or failure to the provider router.
+
+        Cancellation is not a sample here: only a hedge loser's time says anything about the
+        provider, and _run_routed_job records that itself.
+        """
+        started = time.monotonic()
+        try:
+            images = await self._run_pro_job(job, payload, report)
+        except Exception:
+            self.provider_router.record_failure(job['provider_name'])
+            raise
+        self.provider_router.record_success(job['provider_name'], time.monotonic() - started)
+        return images
+
+    async def _run_pro_job(self, job, payload, report):
+        """Submit one Pro API job, poll it to completion and download the result image(s)."""
+        # A job from a previous run may already have produced (and been charged for) this exact request
+        recovered = await self._collect_recovered_job(job['request_key'])
+        if recovered is not None:
+            report(1.0, "Recovered result from a previous session")
+            return recovered
+
+        webhook_token = callback = None
+        first_poll_after = None
+        if self.webhooks.enabled:
+            # Ask the provider to call us back; the poller only kicks in if the callback never comes
+            webhook_token, payload['webhook_url'], callback_future = self.webhooks.expect()
+            payload['webhook_secret'] = webhook_token
+            callback = asyncio.wrap_future(callback_future)
+            first_poll_after = self.webhooks.fallback_after
+
+        try:
+            return await self._submit_and_collect(job, payload, report, callback, first_poll_after)
+        finally:
+            if webhook_token is not None:
+                self.webhooks.discard(webhook_token)
+
+    async def _submit_and_collect(self, job, payload, report, callback, first_poll_after):
+        # Each job holds one of its provider's concurrency slots from submission to download
+        try:
+            async with self.rate_limiter.admit(job['config_key'], report):
+                return await self._submit_and_wait(job, payload, report, callback, first_poll_after)
+        except RateLimitExceeded as e:
+            logging.error(f"⚡ Rate limit queue timeout for {job['config_key']}: {e}")
+            raise gr.Error("⚡ Rate Limited (429): The provider is at capacity and the queue is full. Please try again in a few minutes.")
+
+    async def _submit_job(self, job, payload, report):
+        """POST the job (queued behind the provider's rate limit) and return its polling URL."""
+        api_base, full_endpoint, headers = job['api_base'], job['endpoint'], job['headers']
+        rate_limit_attempt = 0
+        while True:
+            await self.rate_limiter.take_token(job['config_key'])
             try:
-                progress((i + 1) / 25, desc=f"Waiting for result (Attempt {i+1})...")
-                get_response = requests.get(polling_url, headers={"x-key": api_key}, timeout=30)
-                get_response.raise_for_status()
-                result_data = get_response.json()
+                report(0, "Sending request to Pro API...")
+                logging.info(f"🌐 === API REQUEST DEBUG ===")
+                logging.info(f"🌐 Full Endpoint: {full_endpoint}")
+                logging.info(f"🌐 Request Headers: {headers}")
+                logging.info(f"🌐 Payload Keys: {list(payload.keys())}")
+                logging.info(f"🌐 Payload Model: {payload.get('model', 'Unknown')}")
+                logging.info(f"🌐 Payload Steps: {payload.get('num_inference_steps', 'Unknown')}")
+                logging.info(f"🌐 Payload Guidance: {payload.get('guidance_scale', 'Unknown')}")
                 
-                if result_data.get('status') == 'Ready':
-                    progress(0.95, desc="Downloading final image(s)...")
-                    
-                    # --- CORRECTED LOGIC START ---
-                    # The API returns a single URL in 'sample', not a list in 'samples'.
-                    single_sample_url = result_data.get('result', {}).get('sample')
-                    
-                    if not single_sample_url:
-                        logging.error(f"API response did not contain an image URL. Full response: {result_data}")
-                        raise gr.Error("API job succeeded but the response did not contain a valid image URL.")
-
-                    # The rest of the function expects a list, so we put our single URL into a list.
-                    samples = [single_sample_url]
-                    # --- CORRECTED LOGIC END ---
-
-                    images = []
-                    for url in samples:
-                        image_response = requests.get(url)
-                        image_response.raise_for_status()
-                        images.append(Image.open(BytesIO(image_response.content)))
-                    return images
-
-                elif result_data.get('status') == 'failed':
-                    raise gr.Error(f"API job failed: {result_data.get('error', 'Unknown error')}")
+                post_response = await self.pro_client.post_json(api_base, full_endpoint, payload, headers, timeout=120)
                 
-            except requests.exceptions.Timeout:
-                logging.warning(f"⏰ Polling timeout on attempt {i+1}/25")
-                if i >= 22:  # Last few attempts
-                    raise gr.Error("⏰ Polling Timeout: Server is taking too long to process your request. Please try again.")
-            except requests.exceptions.RequestException as e:
-                logging.warning(f"🌐 Polling error on attempt {i+1}/25: {e}")
-                if i >= 22:  # Last few attempts  
-                    raise gr.Error(f"🌐 Polling Error: {e}")
-            
-            time.sleep(2)
+                logging.info(f"🌐 Response Status: {post_response.status_code}")
+                logging.info(f"🌐 Response Content Preview: {post_response.text[:500]}...")
+                logging.info(f"🌐 === END API REQUEST DEBUG ===")
+                
+                polling_url = post_response.json().get('polling_url')
+                if not polling_url:
+                    raise gr.Error(f"API did not return a polling URL. Response: {post_response.text}")
+                return polling_url
+            except httpx.TimeoutException:
+                logging.error("⏰ API Request Timeout - Server took too long to respond")
+                raise gr.Error("⏰ API Timeout: The server is taking too long to respond. Please try again in a moment, or consider switching to a different model provider.")
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                
+                if status_code == 504:
+                    logging.error("🚪 Gateway Timeout (504) - API server is overloaded or unavailable")
+                    raise gr.Error("🚪 Server Timeout (504): The API server is currently overloaded or temporarily unavailable. Please try again in a few minutes, or switch to 'Pro (Black Forest Labs)' model.")
+                elif status_code == 503:
+                    logging.error("🔧 Service Unavailable (503) - API server is down for maintenance")  
+                    raise gr.Error("🔧 Service Unavailable (503): The API server is temporarily down for maintenance. Please try again later or use a different model.")
+                elif status_code == 429:
+                    # Stay in the queue: the limiter pauses the provider for its Retry-After and we resubmit
+                    if self.rate_limiter.on_rate_limited(job['config_key'], e.response, rate_limit_attempt):
+                        rate_limit_attempt += 1
+                        report(0, f"Provider is rate limiting - retrying (attempt {rate_limit_attempt})...")
+                        continue
+                    logging.error("⚡ Rate Limited (429) - Too many requests")
+                    raise gr.Error("⚡ Rate Limited (429): Too many requests. Please wait a moment before trying again.")
+                else:
+                    logging.error(f"❌ HTTP Error {status_code}: {e}")
+                    raise gr.Error(f"❌ API Error ({status_code}): {e}\n\nTry switching to 'Pro (Black Forest Labs)' model or try again later.")
+            except httpx.ConnectError:
+                logging.error("🌐 Connection Error - Cannot reach API server")
+                raise gr.Error("🌐 Connection Error: Cannot reach the API server. Please check your internet connection and try again.")
+            except httpx.HTTPError as e:
+                logging.error("❌ API Request Error", exc_info=True)
+                raise gr.Error(f"❌ API Request Error: {e}\n\nTry switching to a different model provider.")
+
+    async def _submit_and_wait(self, job, payload, report, callback, first_poll_after):
+        api_base = job['api_base']
+        polling_url = await self._submit_job(job, payload, report)
+
+        # Journal the accepted job so it can be resumed if the app stops before it finishes
+        journal_id = self.job_journal.record_submitted(
+            job['request_key'], job['config_key'], job['provider_name'], api_base, polling_url, payload, job['megapixels']
+        )
+
+        try:
+            # Hand the job to the shared poller - it backs off adaptively and wakes us when it is done
+            result_data = await self.job_poller.wait(
+                api_base, polling_url, job['api_key'], megapixels=job['megapixels'], report=report,
+                callback=callback, first_poll_after=first_poll_after
+            )
+            report(0.95, "Downloading final image(s)...")
+            images = await self._download_results(api_base, result_data)
+        except gr.Error as e:
+            self.job_journal.mark(journal_id, STATUS_FAILED, str(e))
+            raise
+        self.job_journal.mark(journal_id, STATUS_COMPLETED)
+        return images
+
+    async def _download_results(self, api_base, result_data):
+        """Fetch the result image(s) of a finished job."""
+        # --- CORRECTED LOGIC START ---
+        # The API returns a single URL in 'sample', not a list in 'samples'.
+        single_sample_url = result_data.get('result', {}).get('sample')
+
+        if not single_sample_url:
+            logging.error(f"API response did not contain an image URL. Full response: {result_data}")
+            raise gr.Error("API job succeeded but the response did not contain a valid image URL.")
+
+        # The rest of the function expects a list, so we put our single URL into a list.
+        samples = [single_sample_url]
+        # --- CORRECTED LOGIC END ---
 
-        raise gr.Error("API request timed out after 50 seconds.")
+        images = []
+        loop = asyncio.get_running_loop()
+        for url in samples:
+            try:
+                content = await self.pro_client.download(api_base, url)
+            except DownloadTooLarge as e:
+                logging.error(f"📥 Result download rejected: {e}")
+                raise gr.Error(f"❌ The generated image is larger than the configured download limit ({e}).")
+            except asyncio.TimeoutError:
+                logging.error("📥 Result download timed out")
+                raise gr.Error("⏰ Download Timeout: The generated image could not be downloaded in time. Please try again.")
+            except httpx.HTTPError as e:
+                logging.error(f"📥 Result download failed: {e}")
+                raise gr.Error(f"❌ Could not download the generated image: {e}")
+            # Decode and verify off the client loop so other jobs keep polling meanwhile
+            images.append(await loop.run_in_executor(None, self._decode_result_image, content))
+        return images
+
+    @staticmethod
+    def _decode_result_image(content):
+        """Fully decode a downloaded result so truncated or corrupt files fail here, not in the UI."""
+        try:
+            img = Image.open(BytesIO(content))
+            img.load()
+        except (OSError, SyntaxError) as e:
+            logging.error(f"📥 Downloaded result is not a valid image: {e}")
+            raise gr.Error("❌ The provider returned a corrupt or incomplete image. Please try again.")
+        return img
+
+    def resume_pending_jobs(self, load_api_key):
+        """Resume polling and downloading Pro API jobs a previous run left unfinished.
+
+        load_api_key maps a provider name to its stored key. Results are kept in the journal
+        until an identical request collects them, so they are never paid for twice.
+        """
+        self.job_journal.prune()
+        for journaled in self.job_journal.unfinished():
+            api_key = load_api_key(journaled['provider_name'])
+            if not api_key:
+                logging.warning(f"📒 Cannot resume job {journaled['id']} - no API key for {journaled['provider_name']}")
+                self.job_journal.mark(journaled['id'], STATUS_EXPIRED, "No API key available to resume")
+                continue
+            logging.info(f"📒 Resuming journaled job {journaled['id']} ({journaled['config_key']})")
+            future = self.pro_client.submit(self._resume_job(journaled, api_key))
+            self._resumed_jobs[journaled['request_key']] = future
+            future.add_done_callback(lambda f, key=journaled['request_key']: self._resumed_jobs.pop(key, None))
+
+    async def _resume_job(self, journaled, api_key):
+        try:
+            result_data = await self.job_poller.wait(
+                journaled['api_base'], journaled['polling_url'], api_key, megapixels=journaled['params'].get('megapixels')
+            )
+            images = await self._download_results(journaled['api_base'], result_data)
+        except Exception as e:
+            logging.warning(f"📒 Resumed job {journaled['id']} did not complete: {e}")
+            self.job_journal.mark(journaled['id'], STATUS_FAILED, str(e))
+            raise
+        self.job_journal.store_recovered(journaled['id'], journaled['request_key'], images)
+        logging.info(f"📒 Resumed job {journaled['id']} finished - result kept for collection")
+        return images
+
+    async def _collect_recovered_job(self, request_key):
+        """Results for this exact request from a job resumed after a restart, if any."""
+        resumed = self._resumed_jobs.get(request_key)
+        if resumed is not None:
+            logging.info("📒 Identical job is being resumed from the journal - attaching to it")
+            try:
+                await asyncio.wrap_future(resumed)
+            except Exception:
+                return None  # The old job failed - submit a fresh one
+        return self.job_journal.collect_recovered(request_key)
 
     def _get_pro_provider_info(self, model_choice):
         """Extract provider info from Pro model choice and return config keys and provider name"""
-        if model_choice == "Pro (Black Forest Labs)":
+        if model_choice == const.PRO_AUTO_MODEL:
+            # Concrete config keys are chosen per job by _call_pro_api_auto
+            return {
+                'provider_name': "any Pro provider",
+                't2i_config_key': 'bfl_flux_t2i',
+                'i2i_config_key': 'bfl_flux_i2i',
+                'auto': True
+            }
+        elif model_choice == "Pro (Black Forest Labs)":
             return {
                 'provider_name': const.FLUX_PRO_API,
                 't2i_config_key': 'bfl_flux_t2i',
@@ -349,24 +748,60 @@ class Generator:
                 'i2i_config_key': 'bfl_flux_i2i'
             }
 
-    def text_to_image(self, prompt, steps, guidance, model_choice, num_images, width, height, api_key="", progress=gr.Progress(track_tqdm=True)):
+    async def _cached_generation(self, cache_key, use_cache, generate, idempotency_key=None, cancel_token=None):
+        """Serve identical requests from the result cache or an identical in-flight job.
+
+        generate() returns the generation coroutine. use_cache=False bypasses the cache (no lookup,
+        no store); callers pass it for unseeded requests, whose every run is a new variation. The idempotency
+        key defaults to the content hash, so a resubmission after a page reload (or a double click)
+        attaches to the job that is still running.
+        """
+        if use_cache and self.result_cache.enabled:
+            cached_images = await asyncio.to_thread(self.result_cache.get, cache_key)
+            if cached_images is not None:
+                logging.info(f"⚡ Result cache hit ({cache_key[:12]}) - skipping generation")
+                gr.Info("⚡ Identical request found in cache - returning the previous result")
+                return cached_images
+
+        idempotency_key = idempotency_key or cache_key
+        if self.in_flight.in_flight(idempotency_key):
+            gr.Info("🔗 An identical generation is already running - waiting for its result")
+
+        async def generate_and_store():
+            images = await generate()
+            if use_cache and self.result_cache.enabled and images:
+                self.result_cache.put(cache_key, images)
+            return images
+
+        try:
+            return await self.in_flight.do_async(idempotency_key, generate_and_store, cancel_token)
+        except GenerationCancelled:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise
+            # We attached to a job whose own request was cancelled - run it ourselves
+            return await self.in_flight.do_async(idempotency_key, generate_and_store, cancel_token)
+
+    async def text_to_image(self, prompt, steps, guidance, model_choice, num_images, width, height, api_key="", progress=gr.Progress(track_tqdm=True), seed=None, use_cache=True, idempotency_key=None, cancel_token=None):
+        cache_key = await asyncio.to_thread(self.result_cache.make_key, 't2i', model_choice, prompt, steps, guidance, num_images, width, height, seed)
+        # Only seeded requests are reproducible - an unseeded Generate must produce a new variation
+        return await self._cached_generation(
+            cache_key, use_cache and seed is not None,
+            lambda: self._text_to_image(prompt, steps, guidance, model_choice, num_images, width, height, api_key, progress, seed, cancel_token),
+            idempotency_key, cancel_token
+        )
+
+    def _local_text_to_image(self, prompt, steps, guidance, num_images, width, height, progress, seed, cancel_token=None):
+        self.warmup.wait_until_ready('t2i', progress, cancel_token)
+        batch_key = ('t2i', int(width), int(height), int(steps), float(guidance), int(num_images))
+        return self.batch_scheduler.submit(batch_key, BatchRequest(prompt, num_images, seed, cancel_token=cancel_token))
+
+    async def _text_to_image(self, prompt, steps, guidance, model_choice, num_images, width, height, api_key, progress, seed, cancel_token=None):
         if model_choice == const.LOCAL_MODEL:
-            if not LOCAL_PROCESSING_AVAILABLE:
+            if not self.local_processing_available():
                 raise gr.Error("🚫 Local processing not available in API-only mode. Missing GPU/CUDA support. Please use 'Pro' models or install GPU requirements: pip install -r requirements-gpu.txt")
-                
-            pipeline = self._load_local_t2i_pipeline()
-            if pipeline is None:
-                raise gr.Error("Local Text-to-Image pipeline could not be loaded. Try using 'Pro' models for API-based generation.")
-            with torch.inference_mode():
-                images = pipeline(
-                    prompt=prompt, 
-                    num_inference_steps=int(steps), 
-                    guidance_scale=float(guidance),
-                    num_images_per_prompt=int(num_images),
-                    width=int(width),
-                    height=int(height)
-                ).images
-                return images
+            
+            # Local inference blocks until the GPU is done - it runs on a worker thread
+            return await asyncio.to_thread(self._local_text_to_image, prompt, steps, guidance, num_images, width, height, progress, seed, cancel_token)
         elif model_choice.startswith("Pro"):
             # Handle provider-specific Pro model selection
             provider_info = self._get_pro_provider_info(model_choice)
@@ -386,28 +821,46 @@ class Generator:
                 "height": int(height),
                 "api_key": api_key
             }
-            return self._call_pro_api(payload, config_key, progress)
+            if seed is not None:
+                payload["seed"] = int(seed)
+            if provider_info.get('auto'):
+                return await self._call_pro_api_auto(payload, 't2i', progress, megapixels=int(width) * int(height) / 1_000_000, cancel_token=cancel_token)
+            return await self._call_pro_api(payload, config_key, progress, megapixels=int(width) * int(height) / 1_000_000, provider_name=provider_name, cancel_token=cancel_token)
         else:
             raise ValueError(f"Invalid model choice: {model_choice}")
             
-    def image_to_image(self, source_image_np, prompt, steps, guidance, model_choice, num_images, width, height, api_key="", background_img=None, object_img=None, aspect_ratio_setting="1:1", progress=gr.Progress()):
+    async def image_to_image(self, source_image_np, prompt, steps, guidance, model_choice, num_images, width, height, api_key="", background_img=None, object_img=None, aspect_ratio_setting="1:1", progress=gr.Progress(), seed=None, use_cache=True, idempotency_key=None, cancel_token=None):
         """Enhanced image-to-image generation with smart dimension handling and depth control"""
-        
+        # Hashing the input images (megabytes of pixels, a fresh ndarray every request) runs off the event loop
+        cache_key = await asyncio.to_thread(
+            self.result_cache.make_key,
+            'i2i', model_choice, prompt, steps, guidance, num_images, width, height, seed,
+            images=(source_image_np, background_img, object_img), aspect_ratio=aspect_ratio_setting
+        )
+        # Only seeded requests are reproducible - an unseeded Generate must produce a new variation
+        return await self._cached_generation(
+            cache_key, use_cache and seed is not None,
+            lambda: self._image_to_image(source_image_np, prompt, steps, guidance, model_choice, num_images, width, height, api_key, background_img, object_img, aspect_ratio_setting, progress, seed, cancel_token),
+            idempotency_key, cancel_token
+        )
+
+    async def _image_to_image(self, source_image_np, prompt, steps, guidance, model_choice, num_images, width, height, api_key, background_img, object_img, aspect_ratio_setting, progress, seed, cancel_token=None):
+
         # Debug logging for input analysis
         if background_img is not None:
             logging.info(f"🔍 Input analysis - Background: {background_img.size}, Object: {object_img.size if object_img else 'None'}")
             logging.info(f"🔍 Requested dimensions: {width}×{height}, Aspect ratio setting: {aspect_ratio_setting}")
-        
+
         # Determine optimal generation size using hybrid approach
         is_pro_api = model_choice.startswith("Pro")
-        
+
         # SPECIAL HANDLING: Pro API multi-image workflow
         if background_img is not None and object_img is not None and is_pro_api:
             # Store user's desired final dimensions
             user_target_width, user_target_height = width, height
             
-            # Always use "Match Input" strategy for generation (most reliable)
-            generation_width, generation_height = background_img.size
+            # Always use "Match Input" strategy for generation (most reliable) - at the upload's size, even if decoded reduced
+            generation_width, generation_height = utils.original_size(background_img)
             
             logging.info(f"🎯 === PRO API MULTI-IMAGE STRATEGY ===")
             logging.info(f"🎯 User Target: {user_target_width}×{user_target_height}")
@@ -429,26 +882,29 @@ class Generator:
             user_target_width, user_target_height = target_width, target_height  # No post-resize needed
             
             # Provide user feedback about dimension choice
-            if optimal_size == background_img.size:
+            if optimal_size == utils.original_size(background_img):
                 gr.Info(f"✅ Using background dimensions: {target_width}×{target_height}")
             elif force_aspect:
                 gr.Info(f"🎯 Using selected aspect ratio: {target_width}×{target_height} ({aspect_ratio_setting})")
             else:
-                gr.Info(f"📐 Optimized dimensions: {target_width}×{target_height} (scaled from {background_img.size[0]}×{background_img.size[1]} for performance)")
+                bg_size = utils.original_size(background_img)
+                gr.Info(f"📐 Optimized dimensions: {target_width}×{target_height} (scaled from {bg_size[0]}×{bg_size[1]} for performance)")
         else:
             # No background info - use provided dimensions
             target_width, target_height = width, height
             user_target_width, user_target_height = width, height  # No post-resize needed
             logging.info(f"🔍 No background - using provided dimensions: {target_width}×{target_height}")
-        
+
         # Final dimension validation and logging
         logging.info(f"🎯 Final generation dimensions: {target_width}×{target_height} ({target_width * target_height:,} pixels)")
-        
+
         if model_choice == const.LOCAL_MODEL:
-            if not LOCAL_PROCESSING_AVAILABLE:
+            if not self.local_processing_available():
                 raise gr.Error("Local model processing is not available. Missing GPU/CUDA support. Please use API mode or install the full requirements with: pip install -r requirements-gpu.txt")
                 
-            kontext_pipeline = self._load_local_i2i_pipeline()
+            # Local loading and inference block - they run on worker threads
+            await asyncio.to_thread(self.warmup.wait_until_ready, 'i2i', progress, cancel_token)
+            kontext_pipeline = await asyncio.to_thread(self._load_local_i2i_pipeline)
             if kontext_pipeline is None:
                 raise gr.Error("Local Image-to-Image pipeline could not be loaded.")
             
@@ -457,7 +913,8 @@ class Generator:
                 # Multi-image context: pass background and object as separate images
                 # Resize background to target size, but preserve object's original proportions
                 if background_img.size != (target_width, target_height):
-                    resized_background = background_img.resize((target_width, target_height), Image.LANCZOS)
+                    source = utils.source_for_size(background_img, (target_width, target_height))
+                    resized_background = await asyncio.to_thread(utils.cached_resize, source, (target_width, target_height), Image.LANCZOS)
                     logging.info(f"📐 Resized background: {background_img.size} → {target_width}×{target_height}")
                 else:
                     resized_background = background_img
@@ -469,8 +926,8 @@ class Generator:
                 logging.info(f"🔍 Object details - Mode: {object_img.mode}, Size: {object_img.size}, Format: {getattr(object_img, 'format', 'Unknown')}")
                 gr.Info(f"Using multi-image context: background resized to {target_width}×{target_height}, object preserved at {object_img.size}")
             else:
-                # Single image input - resize as before
-                current_image_pil = Image.fromarray(source_image_np)
+                # Single image input - resize as before (from the full-resolution upload if the reduced decode is too small)
+                current_image_pil = await asyncio.to_thread(self._single_image_input, source_image_np, background_img, (target_width, target_height))
                 
                 # Resize the input image to match the target dimensions before generation
                 if current_image_pil.size != (target_width, target_height):
@@ -488,20 +945,17 @@ class Generator:
                         logging.info(f"📈 Upscaling source image: {current_image_pil.size} → {target_width}×{target_height}")
                     
                     gr.Info(f"Resizing input image to {target_width}×{target_height} before generation.")
-                    current_image_pil = current_image_pil.resize((target_width, target_height), resize_method)
+                    current_image_pil = await asyncio.to_thread(utils.cached_resize, current_image_pil, (target_width, target_height), resize_method)
                 
                 image_inputs = current_image_pil
                 logging.info(f"🎯 Single image generation: {current_image_pil.size}")
             
-            with torch.inference_mode():
-                images = kontext_pipeline(
-                    image=image_inputs, 
-                    prompt=prompt, 
-                    num_inference_steps=int(steps),
-                    guidance_scale=float(guidance),
-                    num_images_per_prompt=int(num_images)
-                ).images
-            return images
+            batch_key = ('i2i', target_width, target_height, int(steps), float(guidance), int(num_images))
+            request = BatchRequest(prompt, num_images, seed, image=image_inputs, cancel_token=cancel_token)
+            if isinstance(image_inputs, list):
+                # Multi-image context already uses the image list - it cannot share a batch
+                return (await asyncio.to_thread(self._run_local_batch, batch_key, [request]))[0]
+            return await asyncio.to_thread(self.batch_scheduler.submit, batch_key, request)
             
         elif model_choice.startswith("Pro"):
             # Handle provider-specific Pro model selection
@@ -516,8 +970,10 @@ class Generator:
             if background_img and object_img:
                 # For Pro API: intelligently merge images with ENHANCED scaling for human placement
                 # Use preserve_object_scale=True to maintain better object size for human interaction
-                merged_input = utils.merge_images_with_smart_scaling(
-                    background_img, object_img, 
+                background_source = await asyncio.to_thread(utils.source_for_size, background_img, (target_width, target_height))
+                merged_input = await asyncio.to_thread(
+                    utils.merge_images_with_smart_scaling,
+                    background_source, object_img, 
                     target_size=(target_width, target_height),
                     preserve_object_scale=True  # Enhanced scaling for human placement scenarios
                 )
@@ -533,8 +989,8 @@ class Generator:
                 
                 gr.Info(f"Pro API: Using enhanced merged image approach with preserved object scaling (background + object combined)")
             else:
-                # Single image for Pro API
-                pil_img = Image.fromarray(source_image_np)
+                # Single image for Pro API (from the full-resolution upload if the reduced decode is too small)
+                pil_img = await asyncio.to_thread(self._single_image_input, source_image_np, background_img, (target_width, target_height))
                 logging.info(f"🔍 Pro API - Source image size: {pil_img.size}")
                 
                 if pil_img.size != (target_width, target_height):
@@ -549,11 +1005,15 @@ class Generator:
                         resize_method = Image.LANCZOS
                         logging.info(f"📈 Pro API upscaling: {pil_img.size} → {target_width}×{target_height}")
                     
-                    pil_img = pil_img.resize((target_width, target_height), resize_method)
+                    pil_img = await asyncio.to_thread(utils.cached_resize, pil_img, (target_width, target_height), resize_method)
 
-            buffered = BytesIO()
-            pil_img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+            # Encode on the encoder pool in the provider's format and megapixel budget (cached per image)
+            encode_keys = [config_key]
+            if provider_info.get('auto'):
+                encode_keys = [self._get_pro_provider_info(choice)['i2i_config_key'] for choice in ("Pro (Black Forest Labs)", "Pro (GRS AI)")]
+            encoded = await self.image_encoder.encode(pil_img, *encode_keys)
+            # Sent as base64 straight from the compressed bytes while the request streams out
+            input_blob = Base64Blob(encoded.data)
             
             # DETAILED API PAYLOAD LOGGING
             logging.info(f"🚀 === PRO API PAYLOAD DEBUG ===")
@@ -563,24 +1023,29 @@ class Generator:
             logging.info(f"🚀 Steps: {int(steps)}")
             logging.info(f"🚀 Guidance: {float(guidance)}")
             logging.info(f"🚀 Num Images: {int(num_images)}")
-            logging.info(f"🚀 Image Size Being Sent: {pil_img.size}")
+            logging.info(f"🚀 Image Size Being Sent: {encoded.size} ({encoded.format.upper()})")
             logging.info(f"🚀 Image Mode: {pil_img.mode}")
-            logging.info(f"🚀 Base64 Image Length: {len(img_str)} characters")
+            logging.info(f"🚀 Base64 Image Length: {input_blob.encoded_length} characters")
             logging.info(f"🚀 Config Key: {config_key}")
             logging.info(f"🚀 === END API PAYLOAD DEBUG ===")
             
             payload = {
                 "model": self.config.get('api_models', {}).get(config_key, {}).get('model_name'),
                 "prompt": prompt,
-                "input_image": img_str,
+                "input_image": input_blob,
                 "num_inference_steps": int(steps),
                 "guidance_scale": float(guidance),
                 "num_images_per_prompt": int(num_images),
                 "api_key": api_key
             }
+            if seed is not None:
+                payload["seed"] = int(seed)
             
             # Call Pro API
-            api_result = self._call_pro_api(payload, config_key, progress)
+            if provider_info.get('auto'):
+                api_result = await self._call_pro_api_auto(payload, 'i2i', progress, megapixels=encoded.size[0] * encoded.size[1] / 1_000_000, cancel_token=cancel_token)
+            else:
+                api_result = await self._call_pro_api(payload, config_key, progress, megapixels=encoded.size[0] * encoded.size[1] / 1_000_000, provider_name=provider_name, cancel_token=cancel_token)
             
             # POST-PROCESSING: Resize to user's target dimensions if needed
             if (background_img and object_img and 
@@ -591,19 +1056,25 @@ class Generator:
                 logging.info(f"📐 Target: {user_target_width}×{user_target_height}")
                 
                 if api_result and len(api_result) > 0:
-                    original_result = api_result[0]
-                    
-                    # High-quality resize to user's desired dimensions
-                    resized_result = original_result.resize(
-                        (user_target_width, user_target_height),
-                        Image.LANCZOS
-                    )
+                    # High-quality resize of every result to user's desired dimensions.
+                    # Large-format targets go through the tiled stage and come back as PNG file paths
+                    target_size = (user_target_width, user_target_height)
+                    if self.tiled_output.wants(target_size):
+                        resized_results = [
+                            await asyncio.to_thread(self.tiled_output.resize_to_file, original_result, target_size)
+                            for original_result in api_result
+                        ]
+                    else:
+                        resized_results = [
+                            await asyncio.to_thread(original_result.resize, target_size, Image.LANCZOS)
+                            for original_result in api_result
+                        ]
                     
-                    logging.info(f"📐 Resized: {original_result.size} → {resized_result.size}")
+                    logging.info(f"📐 Resized {len(resized_results)} result(s): {api_result[0].size} → {target_size[0]}×{target_size[1]}")
                     gr.Info(f"✅ Generated and resized to {user_target_width}×{user_target_height}")
                     
-                    # Return resized result
-                    return [resized_result]
+                    # Return resized results
+                    return resized_results
                 else:
                     logging.warning("📐 No API result to resize")
                     return api_result
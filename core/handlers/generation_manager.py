@@ -22,7 +22,7 @@ class GenerationManager:
         self._executor = ThreadPoolExecutor(max_workers=2)  # For async operations
         # self.scale_analyzer = ScaleAnalyzer()  # Removed - scale analyzer no longer available
     
-    def run_generation(self, source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress=gr.Progress()):
+    async def run_generation(self, source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress=gr.Progress(), cancel_token=None):
         """Streamlined generation optimized for Pro model workflow with async support"""
         if not prompt or not prompt.strip(): 
             raise gr.Error("Please enter a prompt.")
@@ -54,9 +54,9 @@ class GenerationManager:
         
         # Execute generation based on mode
         if is_create_mode:
-            result_images = self._handle_create_mode(object_image, full_prompt, steps, guidance, model_choice, width, height, api_key, progress)
+            result_images = await self._handle_create_mode(object_image, full_prompt, steps, guidance, model_choice, width, height, api_key, progress, cancel_token)
         else:
-            result_images = self._handle_edit_mode(source_image, object_image, full_prompt, aspect_ratio, steps, guidance, model_choice, width, height, api_key, progress)
+            result_images = await self._handle_edit_mode(source_image, object_image, full_prompt, aspect_ratio, steps, guidance, model_choice, width, height, api_key, progress, cancel_token)
         
         # Return fresh result to avoid caching issues
         return self._prepare_result(result_images)
@@ -182,24 +182,24 @@ class GenerationManager:
     def _determine_dimensions(self, aspect_ratio, source_image, is_create_mode):
         """Determine optimal dimensions based on mode and aspect ratio"""
         if aspect_ratio == "Match Input" and not is_create_mode:
-            width, height = source_image.size
+            width, height = utils.original_size(source_image)  # The upload's size, even if decoded reduced
         else:
             width, height = utils.get_dimensions(aspect_ratio)
         
         return width, height
     
-    def _handle_create_mode(self, object_image, full_prompt, steps, guidance, model_choice, width, height, api_key, progress):
+    async def _handle_create_mode(self, object_image, full_prompt, steps, guidance, model_choice, width, height, api_key, progress, cancel_token=None):
         """Handle Create Mode generation (Text-to-Image)"""
         if object_image:
             gr.Info("Creating new image (object composition in create mode coming soon)")
         
         # Use T2I generation logic
-        result_images = self.generator.text_to_image(
-            full_prompt, steps, guidance, model_choice, 1, width, height, api_key, progress
+        result_images = await self.generator.text_to_image(
+            full_prompt, steps, guidance, model_choice, 1, width, height, api_key, progress, cancel_token=cancel_token
         )
         return result_images
     
-    def _handle_edit_mode(self, source_image, object_image, full_prompt, aspect_ratio, steps, guidance, model_choice, width, height, api_key, progress):
+    async def _handle_edit_mode(self, source_image, object_image, full_prompt, aspect_ratio, steps, guidance, model_choice, width, height, api_key, progress, cancel_token=None):
         """Handle Edit Mode generation (Image-to-Image) optimized for Pro model"""
         if object_image:
             # Pro model optimization: Use background as main input
@@ -214,9 +214,10 @@ class GenerationManager:
         source_np = np.array(input_image)
         
         # Pass to generator with Pro model optimization parameters
-        result_images = self.generator.image_to_image(
+        result_images = await self.generator.image_to_image(
             source_np, full_prompt, steps, guidance, model_choice, 1, width, height, api_key, 
-            background_img=source_image, object_img=object_image, aspect_ratio_setting=aspect_ratio, progress=progress
+            background_img=source_image, object_img=object_image, aspect_ratio_setting=aspect_ratio, progress=progress,
+            cancel_token=cancel_token
         )
         
         return result_images
@@ -226,6 +227,11 @@ class GenerationManager:
         if result_images and len(result_images) > 0:
             result_pil = result_images[0]
             
+            if isinstance(result_pil, str):
+                # Large-format output already streamed to a fresh PNG - hand Gradio the file, not pixels
+                logging.info(f"🎯 Returning result file: {result_pil}")
+                return [result_pil]
+            
             # Create a copy to avoid reference issues
             fresh_result = result_pil.copy()
             
@@ -254,6 +260,15 @@ class GenerationManager:
             api_key = self.secure_storage.load_api_key(const.GRS_AI_FLUX_API)
             logging.info(f"🔑 GRS AI API key loaded: {'✅ Found' if api_key else '❌ Empty'}")
             return api_key
+        elif model_choice == const.PRO_AUTO_MODEL:
+            # Auto routing picks among every provider the user has a key for
+            api_keys = {}
+            for provider_name in (const.FLUX_PRO_API, const.GRS_AI_FLUX_API):
+                api_key = self.secure_storage.load_api_key(provider_name)
+                if api_key:
+                    api_keys[provider_name] = api_key
+            logging.info(f"🔑 Auto routing - keys found for: {', '.join(api_keys) or 'no providers'}")
+            return api_keys
         elif model_choice.startswith("Pro"):
             # Fallback for generic "Pro" choice or compatibility
             api_key = self.secure_storage.load_api_key(const.FLUX_PRO_API)
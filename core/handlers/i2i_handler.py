@@ -2,6 +2,7 @@
 Streamlined I2I Handler - Main orchestrator optimized for Pro model workflow
 Dramatically reduced from 983 lines to focus on essential coordination
 """
+import asyncio
 import os
 import gradio as gr
 import logging
@@ -11,6 +12,8 @@ from .canvas_manager import CanvasManager
 from .auto_prompt_manager import AutoPromptManager
 from .state_manager import StateManager
 from .generation_manager import GenerationManager
+from ..cancellation import GenerationCancelled, make_request_key
+from core import utils
 
 # Import default canvas image
 from ..ui import create_default_canvas_image
@@ -142,7 +145,8 @@ class I2IHandler:
                 self.ui['i2i_guidance'], self.ui['i2i_model_select'], 
                 self.ui['i2i_pin_coords_state'], self.ui['i2i_anchor_coords_state']
             ], 
-            outputs=[self.ui['output_gallery'], self.ui['last_generated_image_state']] if 'last_generated_image_state' in self.ui else [self.ui['output_gallery']]
+            outputs=[self.ui['output_gallery'], self.ui['last_generated_image_state']] if 'last_generated_image_state' in self.ui else [self.ui['output_gallery']],
+            concurrency_limit=self.generator.cancellations.concurrency_limit
         ).then(
             # Clear selection state on new generation
             lambda: None,
@@ -158,9 +162,23 @@ class I2IHandler:
 
     # === Essential Methods - Direct Manager Access ===
     
-    def run_i2i_with_state_update(self, source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress=gr.Progress()):
-        """Wrapper for run_i2i that also returns the last generated image for state tracking."""
-        result_list = self.generation_manager.run_generation(source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress)
+    async def run_i2i_with_state_update(self, source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress=gr.Progress(), request: gr.Request = None):
+        """Wrapper for run_i2i that also returns the last generated image for state tracking.
+        
+        Async: a Pro job is awaited on the event loop, so waiting requests hold no worker thread."""
+        # A new Generate supersedes this session's running generation (an identical one attaches to it); Clear All cancels it
+        session_key = request.session_hash if request is not None else None
+        request_key = await asyncio.to_thread(make_request_key, source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right)
+        cancel_token = self.generator.cancellations.begin(session_key, request_key)
+        try:
+            result_list = await self.generation_manager.run_generation(source_image, object_image, prompt, aspect_ratio, steps, guidance, model_choice, top_left, bottom_right, progress, cancel_token=cancel_token)
+        except GenerationCancelled as e:
+            logging.info(f"🛑 Generation stopped: {e}")
+            gr.Warning(f"Generation cancelled ({e})")
+            no_change = gr.update()
+            return (no_change, no_change) if 'last_generated_image_state' in self.ui else no_change
+        finally:
+            self.generator.cancellations.finish(session_key, cancel_token)
         
         # Return both gallery list and the single image for last_generated_image_state
         last_image = result_list[0] if result_list else None
@@ -183,13 +201,15 @@ class I2IHandler:
         Returns:
             Tuple of outputs for UI updates
         """
-        from PIL import Image
         import os
         
         if not uploaded_files:
             # No files uploaded - reset state
             return [], None, None, None, "**Status:** Ready to upload images 📁", "**Upload images above to start editing**", None, None
         
+        # Uploads are decoded near the working resolution; generation never exceeds ~2048px
+        max_side = int((self.generator.config.get('ingest', {}) or {}).get('max_side', 2048))
+        
         # Process uploaded files (max 10 images) with duplicate filename handling
         processed_images = []
         preview_images = []
@@ -199,11 +219,11 @@ class I2IHandler:
             try:
                 if hasattr(file_obj, 'name'):
                     # File object with .name attribute
-                    img = Image.open(file_obj.name)
+                    img = utils.open_for_editing(file_obj.name, max_side)
                     original_filename = os.path.basename(file_obj.name)
                 else:
                     # Direct file path
-                    img = Image.open(file_obj)
+                    img = utils.open_for_editing(file_obj, max_side)
                     original_filename = os.path.basename(file_obj)
                 
                 # Handle duplicate filenames by adding numbers
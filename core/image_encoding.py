@@ -0,0 +1,99 @@
+"""
+Image Encoding - Compresses input images for Pro API payloads
+Chooses the format (PNG, lossless WebP or high-quality JPEG) per provider, caps the input
+at the provider's megapixel budget, encodes on a worker thread (awaited, so no request thread
+waits on it) and caches the encoded bytes by image fingerprint so repeat generations on the
+same background skip re-encoding
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from core import utils
+from core.byte_lru import ByteBudgetLRU
+
+SUPPORTED_FORMATS = ('png', 'webp', 'jpeg')
+
+# data is the compressed file; size is the (possibly budget-reduced) pixel size that was encoded
+EncodedImage = namedtuple('EncodedImage', ['data', 'format', 'size'])
+
+
+class ImageEncoder:
+    """Encodes Pro API input images off the request thread, with a byte-bounded cache"""
+
+    def __init__(self, config):
+        encoding_config = config.get('image_encoding', {}) or {}
+        self.api_models = config.get('api_models', {}) or {}
+        self.default_format = str(encoding_config.get('format', 'png')).lower()
+        self.jpeg_quality = int(encoding_config.get('jpeg_quality', 95))
+        self.png_compress_level = int(encoding_config.get('png_compress_level', 6))
+        self.webp_effort = int(encoding_config.get('webp_effort', 60))
+        self.cache = ByteBudgetLRU(float(encoding_config.get('cache_size_mb', 256)) * 1024 * 1024, name="encoded inputs")
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(encoding_config.get('workers', 2)), thread_name_prefix="image-encoder"
+        )
+        if self.default_format not in SUPPORTED_FORMATS:
+            logging.warning(f"🗜️ Unknown image_encoding.format '{self.default_format}' - using png")
+            self.default_format = 'png'
+
+    def settings_for(self, *config_keys):
+        """Format all providers accept and the tightest megapixel budget of all of them.
+
+        One payload may be sent to any of the providers (Pro (Auto) routing and failover), so a
+        provider's input_format is only used when every candidate asks for the same one.
+        """
+        models = [self.api_models.get(key, {}) or {} for key in config_keys]
+        formats = {str(model.get('input_format', self.default_format)).lower() for model in models}
+        image_format = formats.pop() if len(formats) == 1 else self.default_format
+        if image_format not in SUPPORTED_FORMATS:
+            image_format = self.default_format
+        budgets = [float(model['max_input_megapixels']) for model in models if model.get('max_input_megapixels')]
+        return image_format, (min(budgets) if budgets else None)
+
+    async def encode(self, img, *config_keys):
+        """Return the EncodedImage of a PIL image for the given provider config key(s).
+
+        Fingerprinting and encoding run on the encoder pool; the caller's event loop keeps serving
+        other requests (admission, queueing, polling) until the bytes are ready.
+        """
+        image_format, max_megapixels = self.settings_for(*config_keys)
+        return await asyncio.wrap_future(self._executor.submit(self._encode_cached, img, image_format, max_megapixels))
+
+    def _encode_cached(self, img, image_format, max_megapixels):
+        key = (utils.image_fingerprint(img), image_format, max_megapixels)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.info(f"🗜️ Reusing encoded input ({image_format.upper()}, {len(cached.data) / 1024:.0f} KB)")
+            return cached
+        encoded = self._encode(img, image_format, max_megapixels)
+        self.cache.put(key, encoded, len(encoded.data))
+        return encoded
+
+    def _encode(self, img, image_format, max_megapixels):
+        started = time.monotonic()
+        width, height = img.size
+        if max_megapixels and width * height > max_megapixels * 1_000_000:
+            scale = math.sqrt(max_megapixels * 1_000_000 / (width * height))
+            reduced = (max(1, int(width * scale)), max(1, int(height * scale)))
+            logging.info(f"🗜️ Input {width}×{height} over the {max_megapixels:g} MP provider budget - reducing to {reduced[0]}×{reduced[1]}")
+            img = img.resize(reduced, Image.LANCZOS)
+
+        buffered = BytesIO()
+        if image_format == 'jpeg':
+            img.convert('RGB').save(buffered, format="JPEG", quality=self.jpeg_quality, subsampling=0, optimize=True)
+        elif image_format == 'webp':
+            img.save(buffered, format="WEBP", lossless=True, quality=self.webp_effort)
+        else:
+            img.save(buffered, format="PNG", compress_level=self.png_compress_level)
+        data = buffered.getvalue()
+        logging.info(
+            f"🗜️ Encoded {img.size[0]}×{img.size[1]} input as {image_format.upper()}: "
+            f"{len(data) / 1024:.0f} KB in {(time.monotonic() - started) * 1000:.0f} ms"
+        )
+        return EncodedImage(data, image_format, img.size)
@@ -0,0 +1,161 @@
+"""
+Job Journal - Durable SQLite record of submitted Pro API jobs
+Keeps each job's polling URL and parameters so jobs that were still running when the app
+stopped can be resumed on the next start, and their (already paid for) results collected
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from PIL import Image
+
+# Job lifecycle: submitted -> completed | failed, or after a restart: submitted -> recovered -> collected
+STATUS_SUBMITTED = 'submitted'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_RECOVERED = 'recovered'
+STATUS_COLLECTED = 'collected'
+STATUS_EXPIRED = 'expired'
+
+# Payload fields that are large or secret and never written to the journal
+_UNJOURNALED_FIELDS = {'input_image', 'api_key', 'webhook_url', 'webhook_secret'}
+
+
+class JobJournal:
+    """SQLite-backed journal of Pro API jobs and the results recovered after a restart"""
+
+    def __init__(self, config):
+        journal_config = config.get('job_journal', {}) or {}
+        self.enabled = bool(journal_config.get('enabled', True))
+        self.path = journal_config.get('path', '.cache/jobs.sqlite3')
+        self.results_dir = journal_config.get('results_dir', '.cache/recovered')
+        self.max_age = float(journal_config.get('max_age_hours', 6)) * 3600
+        self._lock = threading.Lock()
+        self._db = None
+
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            os.makedirs(self.results_dir, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    request_key TEXT NOT NULL,
+                    config_key TEXT NOT NULL,
+                    provider_name TEXT NOT NULL,
+                    api_base TEXT NOT NULL,
+                    polling_url TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result_paths TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_request_key ON jobs (request_key, status)")
+
+    @staticmethod
+    def request_key(config_key, payload):
+        """Hash of the exact provider request - identical payloads map to the same job"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(config_key.encode('utf-8'))
+        for field in sorted(payload):
+            if field in ('api_key', 'webhook_url', 'webhook_secret'):
+                continue
+            digest.update(f"|{field}=".encode('utf-8'))
+            digest.update(str(payload[field]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def record_submitted(self, request_key, config_key, provider_name, api_base, polling_url, payload, megapixels=None):
+        """Journal a job as soon as the provider has accepted it; returns the journal id"""
+        if not self.enabled:
+            return None
+        params = {k: v for k, v in payload.items() if k not in _UNJOURNALED_FIELDS}
+        params['megapixels'] = megapixels
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (request_key, config_key, provider_name, api_base, polling_url, params, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (request_key, config_key, provider_name, api_base, polling_url, json.dumps(params), STATUS_SUBMITTED, now, now)
+            )
+            return cursor.lastrowid
+
+    def mark(self, job_id, status, error=None):
+        if not self.enabled or job_id is None:
+            return
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?", (status, error, time.time(), job_id))
+
+    def unfinished(self):
+        """Jobs still marked submitted that are recent enough to be worth resuming"""
+        if not self.enabled:
+            return []
+        cutoff = time.time() - self.max_age
+        self._execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND created_at < ?", (STATUS_EXPIRED, time.time(), STATUS_SUBMITTED, cutoff))
+        rows = self._execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (STATUS_SUBMITTED,))
+        return [dict(row, params=json.loads(row['params'])) for row in rows]
+
+    def store_recovered(self, job_id, request_key, images):
+        """Persist the results of a resumed job until an identical request collects them"""
+        paths = []
+        for i, img in enumerate(images):
+            path = os.path.join(self.results_dir, f"{request_key}_{i}.png")
+            img.save(path, format="PNG")
+            paths.append(path)
+        self._execute(
+            "UPDATE jobs SET status = ?, result_paths = ?, updated_at = ? WHERE id = ?",
+            (STATUS_RECOVERED, json.dumps(paths), time.time(), job_id)
+        )
+
+    def collect_recovered(self, request_key):
+        """Return recovered results for an identical request (and hand them out only once)"""
+        if not self.enabled:
+            return None
+        rows = self._execute(
+            "SELECT id, result_paths FROM jobs WHERE request_key = ? AND status = ? ORDER BY updated_at DESC LIMIT 1",
+            (request_key, STATUS_RECOVERED)
+        )
+        if not rows:
+            return None
+        images = []
+        try:
+            for path in json.loads(rows[0]['result_paths']):
+                with Image.open(path) as img:
+                    img.load()
+                    images.append(img.copy())
+        except OSError as e:
+            logging.warning(f"📒 Recovered result for job {rows[0]['id']} is unreadable: {e}")
+            self.mark(rows[0]['id'], STATUS_EXPIRED, str(e))
+            return None
+        self._remove_results(rows[0]['result_paths'])
+        self.mark(rows[0]['id'], STATUS_COLLECTED)
+        logging.info(f"📒 Collected recovered result of journaled job {rows[0]['id']}")
+        return images
+
+    def prune(self):
+        """Drop recovered results nobody asked for within max_age"""
+        if not self.enabled:
+            return
+        cutoff = time.time() - self.max_age
+        for row in self._execute("SELECT id, result_paths FROM jobs WHERE status = ? AND updated_at < ?", (STATUS_RECOVERED, cutoff)):
+            self._remove_results(row['result_paths'])
+            self.mark(row['id'], STATUS_EXPIRED)
+
+    @staticmethod
+    def _remove_results(result_paths):
+        for path in json.loads(result_paths or '[]'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
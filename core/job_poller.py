@@ -0,0 +1,219 @@
+"""
+Job Poller - One background task that multiplexes polling for every in-flight Pro API job
+Polls from min_interval with exponential backoff and jitter, learns how long jobs usually take
+per provider and resolution (from the gap between the last pending check and the ready one, so
+the estimate is not skewed by the poll schedule), lands a check on that expected completion
+time, and wakes the waiting request as soon as its job reaches a final state
+"""
+import asyncio
+import itertools
+import logging
+import random
+
+import gradio as gr
+import httpx
+
+# Final statuses reported by Flux-compatible APIs besides 'Ready'
+FAILED_STATUSES = {'failed', 'Failed', 'Error', 'Request Moderated', 'Content Moderated', 'Task not found'}
+
+
+class _PendingJob:
+    """Book-keeping for one in-flight job"""
+
+    def __init__(self, job_id, api_base, polling_url, api_key, estimate_key, future, submitted_at, first_poll_at, deadline, expected):
+        self.job_id = job_id
+        self.api_base = api_base
+        self.polling_url = polling_url
+        self.api_key = api_key
+        self.estimate_key = estimate_key
+        self.future = future
+        self.submitted_at = submitted_at
+        self.next_poll_at = first_poll_at
+        self.deadline = deadline
+        self.expected_at = submitted_at + expected
+        self.last_pending_at = submitted_at  # Latest time the job was seen unfinished
+        self.polls = 0
+        self.backoff_polls = 0  # Checks since backoff last restarted (at submission and at the expected time)
+        self.errors = 0
+        self.polling = False
+
+
+class JobPoller:
+    """Central poller for Pro API jobs, running on the shared Pro API client loop"""
+
+    def __init__(self, client, config):
+        poller_config = config.get('pro_poller', {}) or {}
+        self.client = client
+        self.min_interval = float(poller_config.get('min_interval', 0.5))
+        self.max_interval = float(poller_config.get('max_interval', 8.0))
+        self.backoff_factor = float(poller_config.get('backoff_factor', 1.6))
+        self.jitter = float(poller_config.get('jitter', 0.2))
+        self.request_timeout = float(poller_config.get('request_timeout', 15))
+        self.max_wait = float(poller_config.get('max_wait', 120))
+        self.max_consecutive_errors = int(poller_config.get('max_consecutive_errors', 5))
+        self.default_estimate = float(poller_config.get('default_estimate', 8.0))
+        self.estimate_smoothing = float(poller_config.get('estimate_smoothing', 0.3))
+        self._jobs = {}
+        self._estimates = {}  # (api_base, megapixel bucket) -> smoothed completion seconds
+        self._ids = itertools.count(1)
+        self._wakeup = None
+        self._task = None
+
+    def expected_duration(self, api_base, megapixels=None):
+        """Learned completion time for a provider and output size"""
+        return self._estimates.get(self._estimate_key(api_base, megapixels), self.default_estimate)
+
+    @staticmethod
+    def _estimate_key(api_base, megapixels):
+        # Half-megapixel buckets are fine-grained enough to separate 1MP from 4MP jobs
+        bucket = round((megapixels or 1.0) * 2) / 2
+        return (api_base, bucket)
+
+    async def wait(self, api_base, polling_url, api_key, megapixels=None, report=None, callback=None, first_poll_after=None):
+        """Register a job and wait until it is Ready; returns the final poll response
+
+        callback is an optional future resolved by a webhook delivery; polling then only
+        starts after first_poll_after seconds as a fallback for callbacks that never arrive.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        estimate_key = self._estimate_key(api_base, megapixels)
+        expected = self._estimates.get(estimate_key, self.default_estimate)
+        # Start checking right away and back off; the schedule also lands a check on the expected time
+        if first_poll_after is None:
+            first_poll_after = self.min_interval
+        first_poll_at = now + first_poll_after
+        job = _PendingJob(
+            next(self._ids), api_base, polling_url, api_key, estimate_key,
+            loop.create_future(), now, first_poll_at, now + self.max_wait, expected
+        )
+        self._jobs[job.job_id] = job
+        self._ensure_running()
+        if callback is not None:
+            callback.add_done_callback(lambda cb: self._on_callback(job, cb))
+        logging.info(f"⏳ Poller tracking job {job.job_id} ({len(self._jobs)} in flight, expected ~{expected:.1f}s)")
+
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(job.future), timeout=1.0)
+                except asyncio.TimeoutError:
+                    if report is not None:
+                        elapsed = loop.time() - job.submitted_at
+                        report(min(0.9, elapsed / max(expected * 1.5, elapsed + 1)), f"Waiting for result ({elapsed:.0f}s, {job.polls} checks)...")
+        finally:
+            self._jobs.pop(job.job_id, None)
+
+    def _ensure_running(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._jobs:
+            self._wakeup.clear()
+            now = loop.time()
+            idle_jobs = [job for job in self._jobs.values() if not job.polling and not job.future.done()]
+            for job in idle_jobs:
+                if job.next_poll_at <= now:
+                    job.polling = True
+                    loop.create_task(self._poll(job))
+            waiting = [job.next_poll_at for job in self._jobs.values() if not job.polling]
+            timeout = max(0.0, min(waiting) - now) if waiting else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job):
+        loop = asyncio.get_running_loop()
+        try:
+            if loop.time() > job.deadline:
+                self._fail(job, gr.Error(f"API request timed out after {self.max_wait:.0f} seconds."))
+                return
+            job.polls += 1
+            job.backoff_polls += 1
+            sent_at = loop.time()
+            try:
+                result_data = await self.client.get_json(
+                    job.api_base, job.polling_url, headers={"x-key": job.api_key}, timeout=self.request_timeout
+                )
+                job.errors = 0
+            except httpx.TimeoutException:
+                job.errors += 1
+                logging.warning(f"⏰ Polling timeout for job {job.job_id} ({job.errors} in a row)")
+                if job.errors >= self.max_consecutive_errors:
+                    self._fail(job, gr.Error("⏰ Polling Timeout: Server is taking too long to process your request. Please try again."))
+                return
+            except httpx.HTTPError as e:
+                job.errors += 1
+                logging.warning(f"🌐 Polling error for job {job.job_id} ({job.errors} in a row): {e}")
+                if job.errors >= self.max_consecutive_errors:
+                    self._fail(job, gr.Error(f"🌐 Polling Error: {e}"))
+                return
+
+            status = result_data.get('status')
+            if status == 'Ready':
+                # It finished somewhere between the last pending check and this one
+                finished_at = (job.last_pending_at + sent_at) / 2
+                self._record_duration(job.estimate_key, finished_at - job.submitted_at)
+                if not job.future.done():
+                    job.future.set_result(result_data)
+            elif status in FAILED_STATUSES:
+                self._fail(job, gr.Error(f"API job failed: {result_data.get('error', status)}"))
+            else:
+                job.last_pending_at = sent_at
+        finally:
+            now = loop.time()
+            job.next_poll_at = now + self._next_interval(job, now)
+            job.polling = False
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _on_callback(self, job, callback):
+        """Resolve a job from its webhook body, or poll right away if the body is inconclusive"""
+        if callback.cancelled() or job.future.done():
+            return
+        body = callback.result() or {}
+        status = body.get('status')
+        if status == 'Ready' and (body.get('result') or {}).get('sample'):
+            self._record_duration(job.estimate_key, asyncio.get_running_loop().time() - job.submitted_at)
+            job.future.set_result(body)
+        elif status in FAILED_STATUSES:
+            self._fail(job, gr.Error(f"API job failed: {body.get('error', status)}"))
+        else:
+            # Trust the polling endpoint for anything the callback did not spell out
+            job.next_poll_at = asyncio.get_running_loop().time()
+            self._wakeup.set()
+
+    def _next_interval(self, job, now):
+        """Exponential backoff with jitter, shortened to land a check on the expected completion time.
+
+        Backoff restarts from min_interval once that time has passed, so jobs that run a little
+        over their estimate are still picked up promptly.
+        """
+        until_expected = job.expected_at - now
+        if until_expected <= 0 and job.expected_at > job.submitted_at:
+            job.expected_at = job.submitted_at  # Restart the backoff only once
+            job.backoff_polls = 0
+        interval = min(self.max_interval, self.min_interval * (self.backoff_factor ** max(0, job.backoff_polls - 1)))
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if until_expected > 0:
+            interval = min(interval, max(self.min_interval, until_expected))
+        return interval
+
+    def _record_duration(self, estimate_key, seconds):
+        previous = self._estimates.get(estimate_key)
+        if previous is None:
+            self._estimates[estimate_key] = seconds
+        else:
+            alpha = self.estimate_smoothing
+            self._estimates[estimate_key] = alpha * seconds + (1 - alpha) * previous
+        logging.info(f"📈 Expected completion for {estimate_key[0]} @ {estimate_key[1]}MP: {self._estimates[estimate_key]:.1f}s")
+
+    def _fail(self, job, error):
+        if not job.future.done():
+            job.future.set_exception(error)
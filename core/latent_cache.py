@@ -0,0 +1,61 @@
+"""
+Latent Cache - Reuses Kontext conditioning latents across edits of the same background
+The Kontext pipeline VAE-encodes its input image on every call. The encode is wrapped so
+each input row is looked up by (image fingerprint, processed size, VAE); iterative edits of
+one background encode it once and later calls skip the VAE entirely
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from core import local_stack
+from core import utils
+from core.byte_lru import ByteBudgetLRU
+
+
+class LatentCache:
+    """Byte-budgeted LRU of conditioning latents, stored on the CPU"""
+
+    def __init__(self, config):
+        latent_config = config.get('latent_cache', {}) or {}
+        self.cache = ByteBudgetLRU(float(latent_config.get('cache_size_mb', 256)) * 1024 * 1024, name="conditioning latents")
+        self._local = threading.local()  # Fingerprints of the input rows of the call running on this thread
+
+    @contextmanager
+    def conditioning(self, pipeline, images):
+        """Serve pipeline's image encodes from the cache while it runs on these PIL input images (one per row)"""
+        if not self.cache.enabled or not hasattr(pipeline, '_encode_vae_image'):
+            yield
+            return
+        self._install(pipeline)
+        self._local.fingerprints = [utils.image_fingerprint(image) for image in images]
+        try:
+            yield
+        finally:
+            self._local.fingerprints = None
+
+    def _install(self, pipeline):
+        if getattr(pipeline, '_latent_cache_installed', False):
+            return
+        original = pipeline._encode_vae_image
+        vae_identity = id(getattr(pipeline, 'vae', None))
+
+        def encode_vae_image(image, generator):
+            fingerprints = getattr(self._local, 'fingerprints', None)
+            if not fingerprints or len(fingerprints) != image.shape[0]:
+                return original(image=image, generator=generator)
+            rows = []
+            for index, fingerprint in enumerate(fingerprints):
+                key = (fingerprint, tuple(image.shape[-2:]), vae_identity)
+                latents = self.cache.get(key)
+                if latents is None:
+                    row_generator = generator[index] if isinstance(generator, list) else generator
+                    latents = original(image=image[index:index + 1], generator=row_generator).detach().cpu()
+                    self.cache.put(key, latents, latents.numel() * latents.element_size())
+                else:
+                    logging.info(f"🧊 Reusing conditioning latents for {fingerprint[:12]}")
+                rows.append(latents)
+            return local_stack.load().torch.cat(rows).to(image.device)
+
+        pipeline._encode_vae_image = encode_vae_image
+        pipeline._latent_cache_installed = True
@@ -0,0 +1,76 @@
+"""
+Local Stack - Lazy loader for the local GPU dependencies (torch, diffusers, nunchaku)
+Pro-only deployments never import them: the first Local-model request (or a warm-up)
+imports them once, detects CUDA, and every later caller reuses the result
+"""
+import threading
+from types import SimpleNamespace
+
+_stack = None
+_lock = threading.Lock()
+
+
+def load():
+    """Import the GPU stack once and return a namespace of modules and availability flags"""
+    global _stack
+    if _stack is None:
+        with _lock:
+            if _stack is None:
+                _stack = _import_stack()
+    return _stack
+
+
+def is_loaded():
+    return _stack is not None
+
+
+def local_processing_available():
+    """Local processing needs torch with CUDA and diffusers (imports the stack on first call)"""
+    return load().local_processing_available
+
+
+def _import_stack():
+    stack = SimpleNamespace(
+        torch=None, FluxPipeline=None, FluxKontextPipeline=None,
+        NunchakuFluxTransformer2dModel=None, get_precision=lambda: "fp16",
+        torch_available=False, cuda_available=False, diffusers_available=False,
+        nunchaku_available=False, local_processing_available=False,
+    )
+
+    try:
+        import torch
+        stack.torch = torch
+        stack.torch_available = True
+        stack.cuda_available = torch.cuda.is_available()
+        print(f"✅ PyTorch available - GPU processing {'possible' if stack.cuda_available else 'not available (CPU-only)'}")
+    except ImportError as e:
+        print(f"⚠️ PyTorch not available: {e}")
+
+    # Local FLUX pipelines (only needed for GPU/local processing)
+    try:
+        from diffusers import FluxPipeline, FluxKontextPipeline
+        stack.FluxPipeline, stack.FluxKontextPipeline = FluxPipeline, FluxKontextPipeline
+        stack.diffusers_available = True
+        print("✅ Diffusers with FLUX pipelines available")
+    except ImportError as e:
+        print(f"⚠️ FLUX pipelines not available: {e}")
+        print("🔄 Local processing disabled - Pro API models only")
+
+    # Local processing is only available if we have both torch with CUDA and diffusers
+    stack.local_processing_available = stack.torch_available and stack.diffusers_available and stack.cuda_available
+    if stack.local_processing_available:
+        print("🚀 Local GPU processing enabled")
+    else:
+        print("📡 Local GPU processing unavailable - running in API-only mode")
+
+    # Nunchaku optimization (only needed for GPU processing)
+    try:
+        from nunchaku import NunchakuFluxTransformer2dModel
+        from nunchaku.utils import get_precision
+        stack.NunchakuFluxTransformer2dModel, stack.get_precision = NunchakuFluxTransformer2dModel, get_precision
+        stack.nunchaku_available = True
+        print("✅ Nunchaku optimization available")
+    except ImportError as e:
+        print(f"⚠️ Nunchaku not available: {e}")
+
+    return stack
@@ -0,0 +1,108 @@
+"""
+Mock Provider - Local stand-in for a Flux-compatible Pro API, for offline testing
+Implements submit, polling and result download, and calls back the job's webhook_url
+when one is supplied. Point an api_models entry's api_base at it to use it:
+
+    python -m core.mock_provider --port 8765 --delay 3
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import time
+import uuid
+from io import BytesIO
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from PIL import Image
+
+
+def _render_result(job):
+    """Echo the input image when there is one, otherwise a flat placeholder at the requested size"""
+    input_image = job['payload'].get('input_image')
+    if input_image:
+        img = Image.open(BytesIO(base64.b64decode(input_image))).convert('RGB')
+    else:
+        width = int(job['payload'].get('width') or 1024)
+        height = int(job['payload'].get('height') or 1024)
+        img = Image.new('RGB', (width, height), (118, 140, 168))
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def create_mock_provider(delay=3.0, failure_rate=0.0):
+    """Build the FastAPI app; delay is the simulated generation time in seconds"""
+    app = FastAPI(title="PhotoGen mock Flux provider")
+    jobs = {}
+
+    def job_status(job_id, base_url):
+        job = jobs.get(job_id)
+        if job is None:
+            return {'id': job_id, 'status': 'Task not found'}
+        if time.monotonic() - job['submitted_at'] < delay:
+            return {'id': job_id, 'status': 'Pending'}
+        if job['failed']:
+            return {'id': job_id, 'status': 'Error', 'error': 'Simulated failure'}
+        return {
+            'id': job_id,
+            'status': 'Ready',
+            'result': {'sample': f"{base_url}/mock-results/{job_id}.png", 'seed': job['payload'].get('seed')},
+        }
+
+    async def send_webhook(job_id, base_url):
+        await asyncio.sleep(delay)
+        job = jobs[job_id]
+        body = job_status(job_id, base_url)
+        body['webhook_secret'] = job['payload'].get('webhook_secret')
+        try:
+            async with httpx.AsyncClient() as client:
+                await client.post(job['payload']['webhook_url'], json=body, timeout=10)
+            logging.info(f"📮 Mock provider delivered webhook for {job_id}")
+        except httpx.HTTPError as e:
+            logging.warning(f"📮 Mock provider webhook for {job_id} failed: {e}")
+
+    @app.post("/v1/{model}")
+    async def submit(model: str, request: Request):
+        if not request.headers.get('x-key'):
+            raise HTTPException(status_code=401, detail="Missing x-key header")
+        payload = await request.json()
+        job_id = uuid.uuid4().hex
+        jobs[job_id] = {
+            'payload': payload,
+            'submitted_at': time.monotonic(),
+            'failed': failure_rate > 0 and (uuid.UUID(job_id).int % 1000) < failure_rate * 1000,
+        }
+        base_url = str(request.base_url).rstrip('/')
+        if payload.get('webhook_url'):
+            asyncio.get_running_loop().create_task(send_webhook(job_id, base_url))
+        logging.info(f"🧪 Mock provider accepted {model} job {job_id}")
+        return {'id': job_id, 'polling_url': f"{base_url}/v1/get_result?id={job_id}"}
+
+    @app.get("/v1/get_result")
+    async def get_result(id: str, request: Request):
+        return job_status(id, str(request.base_url).rstrip('/'))
+
+    @app.get("/mock-results/{job_id}.png")
+    async def get_image(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return Response(content=_render_result(job), media_type="image/png")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local mock Flux provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=3.0, help="Simulated generation time in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of jobs that end in an error")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    uvicorn.run(create_mock_provider(args.delay, args.failure_rate), host=args.host, port=args.port)
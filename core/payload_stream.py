@@ -0,0 +1,71 @@
+"""
+Payload Stream - Writes Pro API JSON bodies without materialising the base64 image
+Image fields hold the compressed bytes; the body is produced chunk by chunk while httpx
+sends it, so an in-flight job keeps one copy of the compressed image plus one chunk
+"""
+import base64
+import hashlib
+import json
+
+# Multiple of 3 so every chunk encodes to base64 without padding
+CHUNK_SIZE = 3 * 64 * 1024
+
+
+class Base64Blob:
+    """Raw bytes that are sent as a base64 JSON string"""
+
+    def __init__(self, data):
+        self.data = data
+        self._digest = None
+
+    @property
+    def encoded_length(self):
+        return 4 * ((len(self.data) + 2) // 3)
+
+    def iter_base64(self, chunk_size=CHUNK_SIZE):
+        view = memoryview(self.data)
+        for start in range(0, len(view), chunk_size):
+            yield base64.b64encode(view[start:start + chunk_size])
+
+    def __str__(self):
+        # Stands in for the content in request hashes and logs
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+        return f"<base64 {len(self.data)} bytes {self._digest}>"
+
+    __repr__ = __str__
+
+
+class StreamingJsonBody:
+    """Async iterable JSON body with an exact length, for httpx's content= argument"""
+
+    def __init__(self, payload, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        scalars = {key: value for key, value in payload.items() if not isinstance(value, Base64Blob)}
+        self.blobs = [(key, value) for key, value in payload.items() if isinstance(value, Base64Blob)]
+        head = json.dumps(scalars)
+        if not self.blobs:
+            self._head, self._tail = head.encode('utf-8'), b''
+        else:
+            self._head = (head[:-1] + (', ' if scalars else '')).encode('utf-8')
+            self._tail = b'}'
+        self.length = len(self._head) + len(self._tail)
+        for index, (key, blob) in enumerate(self.blobs):
+            self.length += len(self._blob_prefix(index, key)) + blob.encoded_length + 1
+
+    @staticmethod
+    def _blob_prefix(index, key):
+        return (', ' if index else '').encode('utf-8') + json.dumps(key).encode('utf-8') + b': "'
+
+    def __len__(self):
+        return self.length
+
+    async def __aiter__(self):
+        yield self._head
+        for index, (key, blob) in enumerate(self.blobs):
+            yield self._blob_prefix(index, key)
+            for chunk in blob.iter_base64(self.chunk_size):
+                yield chunk
+            yield b'"'
+        if self._tail:
+            yield self._tail
@@ -0,0 +1,210 @@
+"""
+Pipeline Manager - Memory-budgeted cache of the local diffusers pipelines
+Loads each pipeline once (concurrent requests share the load), hands identical components
+(text encoders, tokenizers, VAE) of an already resident pipeline to the next one built from
+the same model, and evicts the least recently used idle pipeline when the resident weights
+exceed the budget. Load/evict metrics are exposed for tuning the budget
+"""
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from core import local_stack
+from core.single_flight import SingleFlight
+
+DEFAULT_SHARED_COMPONENTS = ['text_encoder', 'text_encoder_2', 'tokenizer', 'tokenizer_2', 'vae']
+
+
+def component_bytes(component):
+    """Bytes held by a torch module's parameters and buffers (0 for tokenizers and other objects)"""
+    if not hasattr(component, 'parameters'):
+        return int(getattr(component, 'memory_bytes', 0))  # Lets stub pipelines declare a size
+    total = 0
+    for tensor in list(component.parameters()) + list(getattr(component, 'buffers', lambda: [])()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class PipelineManager:
+    """LRU cache of local pipelines bounded by memory_budget_gb of resident weights"""
+
+    def __init__(self, config, loaders, sources=None):
+        manager_config = config.get('pipeline_manager', {}) or {}
+        self.max_bytes = int(float(manager_config.get('memory_budget_gb', 0)) * 1024 ** 3)  # 0 = unlimited
+        self.share_components = bool(manager_config.get('share_components', True))
+        self.shared_component_names = list(manager_config.get('shared_components', DEFAULT_SHARED_COMPONENTS))
+        self.estimated_bytes = {
+            kind: int(float(gb) * 1024 ** 3) for kind, gb in (manager_config.get('estimated_gb') or {}).items()
+        }
+        # kind -> factory(shared_components) returning the pipeline (or None when unavailable)
+        self.loaders = loaders
+        # kind -> model id; components are only shared between pipelines of the same model
+        self.sources = sources or {}
+        self._pipelines = OrderedDict()  # kind -> pipeline, least recently used first
+        self._refs = {kind: 0 for kind in loaders}
+        self._run_locks = {kind: threading.Lock() for kind in loaders}
+        self._loads = SingleFlight("pipeline load")
+        self._lock = threading.RLock()
+        self._metrics = {
+            'loads': 0, 'load_seconds_total': 0.0, 'last_load_seconds': {}, 'hits': 0,
+            'evictions': 0, 'evicted_bytes': 0, 'shared_components_reused': 0, 'pipeline_bytes': {},
+        }
+
+    def peek(self, kind):
+        """The resident pipeline for kind, or None (never loads)"""
+        with self._lock:
+            return self._pipelines.get(kind)
+
+    def get(self, kind):
+        """Return the pipeline for kind, loading it once even when several requests race for it"""
+        with self._lock:
+            pipeline = self._pipelines.get(kind)
+            if pipeline is not None:
+                self._pipelines.move_to_end(kind)
+                self._metrics['hits'] += 1
+                return pipeline
+        if self._loads.in_flight(kind):
+            logging.info(f"⏳ {kind} pipeline is already loading - waiting for that load")
+        return self._loads.do(kind, lambda: self._load(kind))
+
+    def _load(self, kind):
+        with self._lock:
+            # Re-check: a load that finished just before we became the leader has already stored it
+            pipeline = self._pipelines.get(kind)
+            if pipeline is not None:
+                return pipeline
+            expected = self._metrics['pipeline_bytes'].get(kind, self.estimated_bytes.get(kind, 0))
+            self._evict_for(expected, keep=kind)
+            shared = self._shared_components_for(kind)
+
+        if shared:
+            logging.info(f"🧩 Reusing {', '.join(sorted(shared))} for the {kind} pipeline")
+        started = time.monotonic()
+        pipeline = self.loaders[kind](shared)
+        seconds = time.monotonic() - started
+        if pipeline is None:
+            return None
+
+        with self._lock:
+            self._pipelines[kind] = pipeline
+            nbytes = self._pipeline_bytes(pipeline, exclude=shared)
+            self._metrics['loads'] += 1
+            self._metrics['load_seconds_total'] += seconds
+            self._metrics['last_load_seconds'][kind] = round(seconds, 2)
+            self._metrics['shared_components_reused'] += len(shared)
+            self._metrics['pipeline_bytes'][kind] = nbytes
+            logging.info(
+                f"🧩 Loaded {kind} pipeline in {seconds:.1f}s ({nbytes / 1024 ** 3:.2f} GB own weights, "
+                f"{self.resident_bytes() / 1024 ** 3:.2f} GB resident)"
+            )
+            self._evict_for(0, keep=kind)
+        return pipeline
+
+    @contextmanager
+    def lease(self, kind):
+        """Hold a reference to a pipeline (loading it if needed) for the duration of one run.
+
+        Leased pipelines are never evicted; runs on the same pipeline are serialized because
+        diffusers pipelines are not safe to call concurrently.
+        """
+        with self._lock:
+            self._refs[kind] += 1
+        try:
+            pipeline = self.get(kind)
+            with self._run_locks[kind]:
+                yield pipeline
+        finally:
+            with self._lock:
+                self._refs[kind] -= 1
+                self._evict_for(0, keep=kind)  # A load that went over budget while this was leased
+
+    def unload(self, kind):
+        """Drop a pipeline unless a request holds it or is loading it; returns True if unloaded"""
+        with self._lock:
+            if self._refs[kind] or self._loads.in_flight(kind) or kind not in self._pipelines:
+                return False
+            self._evict(kind)
+        self._release_memory()
+        return True
+
+    def _shared_components_for(self, kind):
+        """Components of resident pipelines built from the same model, as from_pretrained kwargs"""
+        if not self.share_components:
+            return {}
+        shared = {}
+        for other_kind, other in self._pipelines.items():
+            if other_kind == kind or self.sources.get(other_kind) != self.sources.get(kind) or self.sources.get(kind) is None:
+                continue
+            for name in self.shared_component_names:
+                component = getattr(other, name, None)
+                if component is not None and name not in shared:
+                    shared[name] = component
+        return shared
+
+    def _unique_components(self):
+        """id -> component over every resident pipeline (shared components counted once)"""
+        components = {}
+        for pipeline in self._pipelines.values():
+            for component in self._components_of(pipeline):
+                components[id(component)] = component
+        return components
+
+    @staticmethod
+    def _components_of(pipeline):
+        components = getattr(pipeline, 'components', None)
+        if isinstance(components, dict):
+            return [c for c in components.values() if c is not None]
+        return [pipeline]
+
+    def _pipeline_bytes(self, pipeline, exclude=None):
+        excluded = {id(c) for c in (exclude or {}).values()}
+        return sum(component_bytes(c) for c in self._components_of(pipeline) if id(c) not in excluded)
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(component_bytes(c) for c in self._unique_components().values())
+
+    def _evict_for(self, incoming_bytes, keep=None):
+        """Evict idle pipelines, least recently used first, until incoming_bytes fits the budget"""
+        if not self.max_bytes:
+            return
+        while self.resident_bytes() + incoming_bytes > self.max_bytes:
+            candidates = [kind for kind in self._pipelines if kind != keep and not self._refs[kind]]
+            if not candidates:
+                if self._pipelines:
+                    logging.warning(
+                        f"🧩 Over the {self.max_bytes / 1024 ** 3:.1f} GB pipeline budget but every other pipeline is in use"
+                    )
+                return
+            self._evict(candidates[0])
+            self._release_memory()
+
+    def _evict(self, kind):
+        before = self.resident_bytes()
+        self._pipelines.pop(kind)
+        freed = before - self.resident_bytes()
+        self._metrics['evictions'] += 1
+        self._metrics['evicted_bytes'] += freed
+        logging.info(f"🧩 Evicted {kind} pipeline (freed {freed / 1024 ** 3:.2f} GB, shared components kept while in use)")
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        if local_stack.is_loaded():
+            torch = local_stack.load().torch
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def metrics(self):
+        """Load/evict counters and resident sizes for tuning memory_budget_gb"""
+        with self._lock:
+            return {
+                **{key: (dict(value) if isinstance(value, dict) else value) for key, value in self._metrics.items()},
+                'resident': list(self._pipelines),
+                'resident_bytes': self.resident_bytes(),
+                'budget_bytes': self.max_bytes,
+                'leases': dict(self._refs),
+            }
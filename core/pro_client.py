@@ -0,0 +1,159 @@
+"""
+Pro API Client - Pooled, asyncio-based HTTP client for Flux-compatible Pro APIs
+One background event loop drives every in-flight job, and each provider gets a
+shared keep-alive connection pool (HTTP/2 when the h2 package is installed)
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+
+import httpx
+
+from core.payload_stream import StreamingJsonBody
+
+# HTTP/2 is optional - httpx needs the h2 package for it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class DownloadTooLarge(Exception):
+    """Raised when a result file exceeds the configured maximum download size"""
+
+
+class ProApiClient:
+    """Runs Pro API jobs as coroutines on a shared event loop with one connection pool per provider"""
+
+    def __init__(self, config):
+        client_config = config.get('pro_client', {}) or {}
+        self.http2 = bool(client_config.get('http2', True)) and HTTP2_AVAILABLE
+        self.limits = httpx.Limits(
+            max_connections=int(client_config.get('max_connections', 64)),
+            max_keepalive_connections=int(client_config.get('max_keepalive_connections', 16)),
+            keepalive_expiry=float(client_config.get('keepalive_expiry', 30)),
+        )
+        self.download_read_timeout = float(client_config.get('download_read_timeout', 30))
+        self.download_total_timeout = float(client_config.get('download_total_timeout', 180))
+        self.max_download_bytes = int(float(client_config.get('max_download_mb', 64)) * 1024 * 1024)
+        self.download_retries = int(client_config.get('download_retries', 3))
+        self._clients = {}  # api_base -> httpx.AsyncClient (only touched on the loop thread)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The shared event loop, started lazily on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="pro-api-client", daemon=True)
+                self._thread.start()
+                logging.info(f"🌐 Pro API client loop started (HTTP/2: {'on' if self.http2 else 'off'})")
+        return self._loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the shared loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro_fn, progress=None, cancel_token=None):
+        """Run a job coroutine on the shared loop and await it from the caller's event loop.
+
+        No thread waits on the job. coro_fn receives a report(fraction, desc) callable; progress
+        updates are relayed to the caller's loop in the caller's context, where gr.Progress finds
+        its event. With a cancel token the job is cancelled on the loop as soon as the token is,
+        and it times out (asyncio.TimeoutError) at the token's deadline.
+        """
+        caller_loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+
+        def report(fraction, desc=None):
+            if progress is not None and not caller_loop.is_closed():
+                caller_loop.call_soon_threadsafe(functools.partial(progress, fraction, desc=desc), context=context)
+
+        coro = coro_fn(report)
+        if cancel_token is not None and cancel_token.deadline is not None:
+            coro = asyncio.wait_for(coro, timeout=cancel_token.remaining())
+        future = self.submit(coro)
+        # Cancelling the concurrent future cancels the task, which releases slots and connections
+        remove_callback = cancel_token.add_callback(future.cancel) if cancel_token is not None else None
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+
+    def client_for(self, api_base):
+        """Return the pooled AsyncClient for a provider - call only from the loop thread"""
+        client = self._clients.get(api_base)
+        if client is None:
+            client = httpx.AsyncClient(http2=self.http2, limits=self.limits, follow_redirects=True)
+            self._clients[api_base] = client
+            logging.info(f"🌐 Opened connection pool for {api_base}")
+        return client
+
+    async def post_json(self, api_base, url, payload, headers, timeout):
+        # Image fields are base64-encoded into the body chunk by chunk as it is sent
+        body = StreamingJsonBody(payload)
+        headers = {**headers, 'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        response = await self.client_for(api_base).post(url, content=body, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    async def get_json(self, api_base, url, headers, timeout):
+        response = await self.client_for(api_base).get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def download(self, api_base, url):
+        """Stream a result file into memory, bounded in time and size.
+
+        Transient failures are retried with a Range request for the missing tail, so a dropped
+        connection near the end of a large image does not restart the whole transfer.
+        """
+        return await asyncio.wait_for(self._download(api_base, url), timeout=self.download_total_timeout)
+
+    async def _download(self, api_base, url):
+        client = self.client_for(api_base)
+        data = bytearray()
+        attempt = 0
+        while True:
+            headers = {'Range': f'bytes={len(data)}-'} if data else {}
+            try:
+                async with client.stream('GET', url, headers=headers, timeout=self.download_read_timeout) as response:
+                    response.raise_for_status()
+                    if data and response.status_code != 206:
+                        data.clear()  # Server ignored the Range header - start over
+                    expected = response.headers.get('Content-Length')
+                    if expected is not None and len(data) + int(expected) > self.max_download_bytes:
+                        raise DownloadTooLarge(f"result is {(len(data) + int(expected)) / 1024 / 1024:.1f} MB")
+                    async for chunk in response.aiter_bytes():
+                        data.extend(chunk)
+                        if len(data) > self.max_download_bytes:
+                            raise DownloadTooLarge(f"result exceeded {self.max_download_bytes / 1024 / 1024:.0f} MB")
+                return data
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or e.response.status_code >= 500
+                if not retryable or attempt >= self.download_retries:
+                    raise
+                attempt += 1
+                delay = min(8.0, 0.5 * 2 ** attempt)
+                logging.warning(f"📥 Download interrupted after {len(data) / 1024:.0f} KB ({e!r}) - resuming in {delay:.1f}s (attempt {attempt})")
+                await asyncio.sleep(delay)
+
+    def close(self):
+        """Close every provider pool and stop the loop"""
+        if self._loop is None:
+            return
+
+        async def _close_all():
+            for client in self._clients.values():
+                await client.aclose()
+            self._clients.clear()
+
+        self.submit(_close_all()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
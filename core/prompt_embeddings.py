@@ -0,0 +1,62 @@
+"""
+Prompt Embeddings - Byte-budgeted cache of FLUX text-encoder outputs
+Preset and template prompts repeat across requests; their T5/CLIP embeddings are computed
+once per (text encoders, prompt) and handed to the pipeline as prompt_embeds, so repeated
+prompts skip text encoding (and the encoder offload round trip) entirely
+"""
+import logging
+
+from core import local_stack
+from core.byte_lru import ByteBudgetLRU
+
+
+def _encoder_identity(encoder):
+    """Model path plus object identity, so reloaded or different encoders never share entries"""
+    if encoder is None:
+        return None
+    name = getattr(getattr(encoder, 'config', None), '_name_or_path', type(encoder).__name__)
+    return name, id(encoder)
+
+
+class PromptEmbeddingCache:
+    """LRU of (prompt_embeds, pooled_prompt_embeds) per prompt, stored on the CPU"""
+
+    def __init__(self, config):
+        embedding_config = config.get('prompt_embedding_cache', {}) or {}
+        self.max_sequence_length = int(embedding_config.get('max_sequence_length', 512))
+        self.cache = ByteBudgetLRU(float(embedding_config.get('cache_size_mb', 512)) * 1024 * 1024, name="prompt embeddings")
+
+    def pipeline_kwargs(self, pipeline, prompts, num_images):
+        """prompt_embeds/pooled_prompt_embeds kwargs for a pipeline call, or None to let it encode itself.
+
+        The embeddings are repeated per image, so the call must use num_images_per_prompt=1.
+        """
+        if not self.cache.enabled or not hasattr(pipeline, 'encode_prompt'):
+            return None
+        torch = local_stack.load().torch
+        device = pipeline._execution_device
+        encoders = (_encoder_identity(getattr(pipeline, 'text_encoder', None)),
+                    _encoder_identity(getattr(pipeline, 'text_encoder_2', None)))
+        embeddings = [self._embedding(pipeline, encoders, prompt, device) for prompt in prompts]
+        prompt_embeds = torch.cat([embeds for embeds, _ in embeddings]).to(device)
+        pooled_prompt_embeds = torch.cat([pooled for _, pooled in embeddings]).to(device)
+        return {
+            'prompt_embeds': prompt_embeds.repeat_interleave(num_images, dim=0),
+            'pooled_prompt_embeds': pooled_prompt_embeds.repeat_interleave(num_images, dim=0),
+            'num_images_per_prompt': 1,
+        }
+
+    def _embedding(self, pipeline, encoders, prompt, device):
+        key = (encoders, self.max_sequence_length, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.info(f"🔤 Reusing prompt embeddings ({prompt[:40]!r})")
+            return cached
+        prompt_embeds, pooled_prompt_embeds, _ = pipeline.encode_prompt(
+            prompt=prompt, prompt_2=None, device=device,
+            num_images_per_prompt=1, max_sequence_length=self.max_sequence_length
+        )
+        embedding = (prompt_embeds.detach().cpu(), pooled_prompt_embeds.detach().cpu())
+        nbytes = sum(tensor.numel() * tensor.element_size() for tensor in embedding)
+        self.cache.put(key, embedding, nbytes)
+        return embedding
@@ -0,0 +1,117 @@
+"""
+Provider Router - Latency-driven choice between the Pro API providers
+Keeps rolling latency percentiles and error rates per provider, ranks providers for each
+new job, and tells the caller when a job has run past the tail-latency threshold so it
+can be hedged to the runner-up
+"""
+import logging
+import threading
+from collections import deque
+
+
+class _ProviderStats:
+    """Rolling window of outcomes for one provider"""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)  # Seconds for successful (or abandoned) jobs
+        self.outcomes = deque(maxlen=window)  # True for success, False for failure
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def samples(self):
+        """Jobs observed - completed, abandoned after losing a hedge, or failed"""
+        return len(self.latencies) + self.outcomes.count(False)
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ProviderRouter:
+    """Ranks Pro providers by observed latency and reliability"""
+
+    def __init__(self, config):
+        router_config = config.get('provider_router', {}) or {}
+        self.window = int(router_config.get('window', 50))
+        self.min_samples = int(router_config.get('min_samples', 3))
+        self.error_penalty = float(router_config.get('error_penalty', 3.0))
+        self.default_latency = float(router_config.get('default_latency', 20.0))
+        self.hedge_enabled = bool(router_config.get('hedge', False))
+        self.hedge_percentile = float(router_config.get('hedge_percentile', 95))
+        self.hedge_min_delay = float(router_config.get('hedge_min_delay', 10.0))
+        self._stats = {}
+        self._lock = threading.Lock()  # Recorded on the client loop, ranked from request threads
+
+    def _stats_for(self, provider_name):
+        stats = self._stats.get(provider_name)
+        if stats is None:
+            stats = _ProviderStats(self.window)
+            self._stats[provider_name] = stats
+        return stats
+
+    def record_success(self, provider_name, seconds):
+        with self._lock:
+            stats = self._stats_for(provider_name)
+            stats.latencies.append(seconds)
+            stats.outcomes.append(True)
+
+    def record_failure(self, provider_name):
+        with self._lock:
+            self._stats_for(provider_name).outcomes.append(False)
+
+    def record_abandoned(self, provider_name, seconds):
+        """A job cancelled after losing a hedge took at least this long - count it as a latency sample.
+
+        Only for hedge losers: cancellations by the request (cleared, superseded, deadline) say
+        nothing about the provider.
+        """
+        with self._lock:
+            self._stats_for(provider_name).latencies.append(seconds)
+
+    def score(self, provider_name):
+        """Expected cost of sending a job to a provider - lower is better"""
+        with self._lock:
+            stats = self._stats_for(provider_name)
+            if stats.samples < self.min_samples:
+                # Not enough data yet: assume the default so every provider gets explored
+                return self.default_latency
+            p50 = stats.percentile(50) or self.default_latency
+            return p50 * (1 + self.error_penalty * stats.error_rate)
+
+    def rank(self, provider_names):
+        """Providers ordered best first (stable, so the caller's order breaks ties)"""
+        scores = {name: self.score(name) for name in provider_names}
+        ranked = sorted(provider_names, key=scores.get)
+        logging.info(f"🧭 Provider ranking: {', '.join(f'{name} ({scores[name]:.1f}s)' for name in ranked)}")
+        return ranked
+
+    def hedge_after(self, provider_name):
+        """Seconds after which a job on this provider should be hedged, or None when hedging is off"""
+        if not self.hedge_enabled:
+            return None
+        with self._lock:
+            stats = self._stats_for(provider_name)
+            if len(stats.latencies) < self.min_samples:
+                return max(self.hedge_min_delay, self.default_latency * 2)
+            return max(self.hedge_min_delay, stats.percentile(self.hedge_percentile))
+
+    def snapshot(self):
+        """p50/p95 latency and error rate per provider, for logging and tuning"""
+        with self._lock:
+            return {
+                name: {
+                    'p50': stats.percentile(50),
+                    'p95': stats.percentile(95),
+                    'error_rate': stats.error_rate,
+                    'samples': stats.samples,
+                }
+                for name, stats in self._stats.items()
+            }
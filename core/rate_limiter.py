@@ -0,0 +1,138 @@
+"""
+Rate Limiter - Provider-aware admission control for Pro API jobs
+A token bucket per api_models config key caps submissions per second, a semaphore caps
+jobs in flight, and 429 responses pause the bucket for the provider's Retry-After.
+Requests over the limit wait in line instead of failing
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+DEFAULT_LIMITS = {
+    'requests_per_second': 2.0,
+    'burst': 4,
+    'max_concurrency': 8,
+    'max_queue_wait': 300,
+    'max_rate_limit_retries': 5,
+    'default_retry_after': 5,
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request waited longer than max_queue_wait for provider capacity"""
+
+
+class _ProviderBucket:
+    """Token bucket plus concurrency cap for one config key; used only on the client loop"""
+
+    def __init__(self, name, limits):
+        self.name = name
+        self.rate = float(limits['requests_per_second'])
+        self.capacity = float(limits['burst'])
+        self.max_concurrency = int(limits['max_concurrency'])
+        self.max_queue_wait = float(limits['max_queue_wait'])
+        self.max_rate_limit_retries = int(limits['max_rate_limit_retries'])
+        self.default_retry_after = float(limits['default_retry_after'])
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.queued = 0
+        self._slots = None
+        self._token_lock = None
+
+    def _primitives(self):
+        # Created lazily so they bind to the client loop rather than the constructing thread
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._token_lock = asyncio.Lock()
+        return self._slots, self._token_lock
+
+    async def take_token(self):
+        """Wait for a submission token, honouring any Retry-After pause (FIFO via the lock)"""
+        _, token_lock = self._primitives()
+        async with token_lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Stop handing out tokens until the provider's Retry-After has passed"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class RateLimiter:
+    """Admission queue in front of every Pro API provider config key"""
+
+    def __init__(self, config):
+        limits_config = config.get('rate_limits', {}) or {}
+        self._defaults = {**DEFAULT_LIMITS, **(limits_config.get('default') or {})}
+        self._overrides = {key: value for key, value in limits_config.items() if key != 'default'}
+        self._buckets = {}
+
+    def bucket(self, config_key):
+        bucket = self._buckets.get(config_key)
+        if bucket is None:
+            bucket = _ProviderBucket(config_key, {**self._defaults, **(self._overrides.get(config_key) or {})})
+            self._buckets[config_key] = bucket
+        return bucket
+
+    @asynccontextmanager
+    async def admit(self, config_key, report=None):
+        """Hold one of the provider's concurrency slots for the lifetime of a job"""
+        bucket = self.bucket(config_key)
+        slots, _ = bucket._primitives()
+        if slots.locked():
+            logging.info(f"🚦 {config_key} at its concurrency cap - request queued ({bucket.queued + 1} waiting)")
+            if report is not None:
+                report(0, f"Queued - waiting for provider capacity ({bucket.queued + 1} in line)...")
+        bucket.queued += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=bucket.max_queue_wait)
+        except asyncio.TimeoutError:
+            raise RateLimitExceeded(f"waited {bucket.max_queue_wait:.0f}s for a free slot")
+        finally:
+            bucket.queued -= 1
+        try:
+            yield bucket
+        finally:
+            slots.release()
+
+    async def take_token(self, config_key):
+        bucket = self.bucket(config_key)
+        try:
+            await asyncio.wait_for(bucket.take_token(), timeout=bucket.max_queue_wait)
+        except asyncio.TimeoutError:
+            raise RateLimitExceeded(f"waited {bucket.max_queue_wait:.0f}s for a request token")
+
+    def on_rate_limited(self, config_key, response, attempt):
+        """Pause the bucket after a 429; returns True while the request should be retried"""
+        bucket = self.bucket(config_key)
+        retry_after = self._parse_retry_after(response.headers.get('Retry-After'), bucket.default_retry_after * (2 ** attempt))
+        bucket.pause(retry_after)
+        logging.warning(f"🚦 {config_key} returned 429 - pausing submissions for {retry_after:.1f}s (attempt {attempt + 1})")
+        return attempt < bucket.max_rate_limit_retries
+
+    @staticmethod
+    def _parse_retry_after(value, default):
+        """Retry-After is either delta-seconds or an HTTP date"""
+        if not value:
+            return default
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
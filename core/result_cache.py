@@ -0,0 +1,168 @@
+"""
+Result Cache - Disk-backed, content-addressed cache of generated images
+Keyed by a hash of everything that determines a generation (prompt, input image bytes,
+steps, guidance, dimensions, provider, seed) and bounded by a size-based LRU policy
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from core import utils
+
+
+class ResultCache:
+    """Size-bounded LRU cache of generation results stored as PNG files"""
+
+    def __init__(self, config):
+        cache_config = config.get('result_cache', {}) or {}
+        self.enabled = bool(cache_config.get('enabled', True))
+        self.directory = cache_config.get('directory', '.cache/results')
+        self.max_bytes = int(float(cache_config.get('max_size_mb', 1024)) * 1024 * 1024)
+        # Hits at least this large are returned as file paths, like fresh tiled (large-format) outputs
+        tiled_config = config.get('tiled_output', {}) or {}
+        self.file_min_pixels = float(tiled_config.get('min_megapixels', 6)) * 1_000_000
+        self._entries = OrderedDict()  # key -> (file paths, total bytes), least recently used first
+        self._pending = {}  # key -> images still being written, served from memory until the PNGs land
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")  # Keep PNG encoding off the request path
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_index()
+
+    @staticmethod
+    def make_key(kind, model_choice, prompt, steps, guidance, num_images, width, height, seed=None, images=(), **extra):
+        """Content hash of every input that determines a generation result"""
+        fields = {
+            'kind': kind,
+            'model': model_choice,
+            'prompt': prompt,
+            'steps': int(steps),
+            'guidance': round(float(guidance), 4),
+            'num_images': int(num_images),
+            'width': int(width),
+            'height': int(height),
+            'seed': seed,
+            'images': [utils.image_fingerprint(img) if img is not None else None for img in images],
+            'extra': extra,
+        }
+        encoded = json.dumps(fields, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files already on disk (oldest access first)"""
+        entries = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.png') or '_' not in name:
+                continue
+            path = os.path.join(self.directory, name)
+            key = name.rsplit('_', 1)[0]
+            stat = os.stat(path)
+            paths, size, mtime = entries.get(key, ([], 0, 0))
+            entries[key] = (paths + [path], size + stat.st_size, max(mtime, stat.st_mtime))
+        for key, (paths, size, _) in sorted(entries.items(), key=lambda item: item[1][2]):
+            self._entries[key] = (sorted(paths), size)
+            self._total_bytes += size
+        if self._entries:
+            logging.info(f"🗄️ Result cache: {len(self._entries)} entries, {self._total_bytes / 1024 / 1024:.1f} MB")
+        self._evict()
+
+    def get(self, key):
+        """Return the cached images (file paths for large-format results) for a key, or None on a miss"""
+        with self._lock:
+            pending = self._pending.get(key)
+            entry = self._entries.get(key)
+            if pending is None and entry is None:
+                return None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if pending is not None:
+            return [img if isinstance(img, str) else img.copy() for img in pending]
+        paths, _ = entry
+        images = []
+        try:
+            for path in paths:
+                with Image.open(path) as img:
+                    if img.width * img.height >= self.file_min_pixels:
+                        images.append(path)
+                    else:
+                        img.load()
+                        images.append(img.copy())
+                os.utime(path)  # Persist recency across restarts
+        except OSError as e:
+            logging.warning(f"🗄️ Dropping unreadable cache entry {key[:12]}: {e}")
+            self._remove(key)
+            return None
+        return images
+
+    def put(self, key, images):
+        """Store results; they are served from memory at once and written to disk in the background.
+
+        Evicts least recently used entries over budget.
+        """
+        if not images:
+            return
+        images = list(images)
+        with self._lock:
+            self._pending[key] = images
+        self._writer.submit(self._write, key, images)
+
+    def _write(self, key, images):
+        paths = []
+        size = 0
+        try:
+            for i, img in enumerate(images):
+                path = os.path.join(self.directory, f"{key}_{i}.png")
+                if isinstance(img, str):
+                    shutil.copyfile(img, path)  # Already-encoded PNG (tiled output)
+                else:
+                    img.save(path, format="PNG", compress_level=1)
+                paths.append(path)
+                size += os.path.getsize(path)
+        except Exception as e:
+            logging.warning(f"🗄️ Could not cache result {key[:12]}: {e}")
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            with self._lock:
+                if self._pending.get(key) is images:
+                    del self._pending[key]
+            return
+        with self._lock:
+            if self._pending.get(key) is images:
+                del self._pending[key]
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (paths, size)
+            self._total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                key = next(iter(self._entries))
+            logging.info(f"🗄️ Evicting cached result {key[:12]} (cache over {self.max_bytes / 1024 / 1024:.0f} MB)")
+            self._remove(key)
+
+    def _remove(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self._total_bytes -= entry[1]
+        for path in entry[0]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
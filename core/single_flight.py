@@ -0,0 +1,97 @@
+"""
+Single Flight - Coalesces concurrent calls that share a key onto one execution
+Callers that arrive while a call with the same key is running wait for its result
+instead of starting a duplicate (e.g. a second paid Pro API job)
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from core.cancellation import GenerationCancelled
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; later callers share the leader's result"""
+
+    def __init__(self, name="call"):
+        self.name = name
+        self._calls = {}  # key -> Future of the running call
+        self._lock = threading.Lock()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def _join(self, key):
+        """(future, is_leader) for key - the first caller becomes the leader"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()  # A follower giving up must not cancel the shared result
+            self._calls[key] = future
+            return future, True
+
+    def do(self, key, fn, cancel_token=None):
+        """Run fn() for key, or wait for the identical call that is already running.
+
+        A waiting caller checks its cancel token between slices, so cancelling it releases the
+        caller while the shared call keeps running for the others.
+        """
+        future, is_leader = self._join(key)
+
+        if not is_leader:
+            logging.info(f"🔗 Identical {self.name} already running ({str(key)[:12]}) - attaching to it")
+            while True:
+                try:
+                    return future.result(timeout=0.5)
+                except FutureTimeout:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key, coro_fn, cancel_token=None):
+        """Awaitable do(): run coro_fn() for key, or await the identical call that is already running"""
+        future, is_leader = self._join(key)
+
+        if not is_leader:
+            logging.info(f"🔗 Identical {self.name} already running ({str(key)[:12]}) - attaching to it")
+            waiter = asyncio.wrap_future(future)
+            try:
+                while True:
+                    try:
+                        return await asyncio.wait_for(asyncio.shield(waiter), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled()
+            finally:
+                waiter.cancel()  # Only detaches this caller - the shared future is already running
+
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            # The leader's task was cancelled (e.g. its client went away) - followers may run it themselves
+            future.set_exception(GenerationCancelled("the original request was cancelled"))
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,194 @@
+"""
+Tiled Output - Bounded-memory resize of large product outputs, streamed to a PNG file
+Outputs such as 4157×1843 or 1748×5244 are resized in horizontal strips on a process pool
+(each worker resizes, PNG-filters and deflates only its own rows, so the GIL and the event
+loop stay free) and the encoded strips are written to disk in order as they arrive. The
+output matches a full-frame LANCZOS resize (to within float rounding of the strip boxes)
+without the full frame ever being held in memory. The calling thread still waits for the
+file; the pool is started at boot so the first large output does not pay for the workers
+"""
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+import numpy as np
+from PIL import Image
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_ZLIB_HEADER = b'\x78\x9c'
+_ADLER_BASE = 65521
+_LANCZOS_RADIUS = 3.0
+
+
+def _adler32_combine(adler1, adler2, length2):
+    """Adler-32 of A + B from adler32(A), adler32(B) and len(B) (zlib's adler32_combine)"""
+    remainder = length2 % _ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (remainder * sum1) % _ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xffff) + _ADLER_BASE - 1) % _ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - remainder) % _ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def _warm_worker():
+    """Worker: no-op task used to start the pool processes ahead of the first output"""
+    return os.getpid()
+
+
+def _encode_strip(source_bytes, source_size, box, strip_size, compress_level, last):
+    """Worker: LANCZOS-resize one strip, PNG-filter and raw-deflate it (runs in a pool process).
+
+    Returns (deflate segment, adler32 of the filtered bytes, their length). Segments end on a
+    byte-aligned sync flush, so the parent can concatenate them into one zlib stream.
+    """
+    source = Image.frombytes('RGB', source_size, source_bytes)
+    width, height = strip_size
+    rows = np.frombuffer(source.resize(strip_size, Image.LANCZOS, box=box).tobytes(), dtype=np.uint8).reshape(height, width * 3)
+    filtered = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    filtered[0, 0], filtered[0, 1:] = 0, rows[0]  # "None" for the first row: the row above is in another strip
+    filtered[1:, 0] = 2  # "Up": each byte minus the byte above it (mod 256)
+    filtered[1:, 1:] = rows[1:] - rows[:-1]
+    raw = filtered.tobytes()
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(raw), len(raw)
+
+
+class _PngWriter:
+    """Writes an RGB PNG from deflate segments produced by _encode_strip, in order"""
+
+    def __init__(self, file, width, height):
+        self._file = file
+        self._adler = 1
+        file.write(_PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        self._chunk(b'IDAT', _ZLIB_HEADER)
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)) + kind + data)
+        self._file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def write_segment(self, data, adler, length):
+        self._chunk(b'IDAT', data)
+        self._adler = _adler32_combine(self._adler, adler, length)
+
+    def close(self):
+        self._chunk(b'IDAT', struct.pack('>I', self._adler))
+        self._chunk(b'IEND', b'')
+
+
+class TiledOutput:
+    """Resizes results above min_megapixels strip by strip and returns the PNG path"""
+
+    def __init__(self, config):
+        tiled_config = config.get('tiled_output', {}) or {}
+        self.enabled = bool(tiled_config.get('enabled', True))
+        self.min_pixels = float(tiled_config.get('min_megapixels', 6)) * 1_000_000
+        self.strip_height = int(tiled_config.get('strip_height', 256))
+        self.workers = int(tiled_config.get('workers', 2))
+        self.compress_level = int(tiled_config.get('png_compress_level', 6))
+        self.directory = tiled_config.get('directory', '.cache/large_outputs')
+        self.max_files = int(tiled_config.get('max_files', 50))
+        self._pool = None
+        self._pool_lock = Lock()
+
+    def wants(self, size):
+        """True when an output of this size should go through the tiled stage"""
+        return self.enabled and size[0] * size[1] >= self.min_pixels
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that runs the asyncio client and Gradio threads is unsafe.
+                # Each spawned worker re-imports the main module (app.py: ~5 s of gradio imports on one
+                # core) before its first strip, which is why start() brings the pool up at boot
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def start(self):
+        """Start the worker processes in the background (no-op when the tiled stage is disabled)"""
+        if self.enabled:
+            threading.Thread(target=self._warm, name="tiled-output-warmup", daemon=True).start()
+
+    def _warm(self):
+        started = time.monotonic()
+        try:
+            executor = self._executor()
+            pids = {future.result() for future in [executor.submit(_warm_worker) for _ in range(self.workers)]}
+        except Exception as e:
+            logging.warning(f"🧱 Tiled output workers failed to start ahead of time: {e}")
+            return
+        logging.info(f"🧱 Tiled output pool ready: {len(pids)} worker(s) in {time.monotonic() - started:.1f}s")
+
+    def _strips(self, img, size):
+        """(source crop, box within the crop, strip size, is last) for every output strip, top to bottom"""
+        width, height = size
+        source_width, source_height = img.size
+        scale = source_height / height
+        margin = math.ceil(_LANCZOS_RADIUS * max(scale, 1.0)) + 2  # Filter support plus rounding slack
+        for top in range(0, height, self.strip_height):
+            bottom = min(top + self.strip_height, height)
+            source_top, source_bottom = top * scale, bottom * scale
+            crop_top = max(0, math.floor(source_top) - margin)
+            crop_bottom = min(source_height, math.ceil(source_bottom) + margin)
+            crop = img.crop((0, crop_top, source_width, crop_bottom))
+            box = (0, source_top - crop_top, source_width, source_bottom - crop_top)
+            yield crop, box, (width, bottom - top), bottom == height
+
+    def resize_to_file(self, img, size):
+        """LANCZOS-resize img to size in strips and stream it to a PNG; returns the file path.
+
+        Blocks the calling thread until the file is written - call it from a worker thread.
+        """
+        started = time.monotonic()
+        img = img if img.mode == 'RGB' else img.convert('RGB')
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"photogen_{size[0]}x{size[1]}_{uuid.uuid4().hex[:12]}.png")
+        partial = path + '.part'
+        executor = self._executor()
+        in_flight = deque()
+        window = max(2, self.workers * 2)  # Bounds the encoded-but-unwritten strips held in memory
+        try:
+            with open(partial, 'wb') as f:
+                writer = _PngWriter(f, *size)
+                for crop, box, strip_size, last in self._strips(img, size):
+                    in_flight.append(executor.submit(_encode_strip, crop.tobytes(), crop.size, box, strip_size, self.compress_level, last))
+                    if len(in_flight) >= window:
+                        writer.write_segment(*in_flight.popleft().result())
+                while in_flight:
+                    writer.write_segment(*in_flight.popleft().result())
+                writer.close()
+            os.replace(partial, path)
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        logging.info(f"🧱 Tiled resize {img.size[0]}×{img.size[1]} → {size[0]}×{size[1]} in {time.monotonic() - started:.1f}s ({os.path.getsize(path) / 1024 / 1024:.1f} MB PNG)")
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Keep only the newest max_files outputs (the UI has its own copy once displayed)"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.png')]
+        except OSError:
+            return
+        if len(names) <= self.max_files:
+            return
+        paths = sorted((os.path.join(self.directory, name) for name in names), key=os.path.getmtime)
+        for old in paths[:-self.max_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
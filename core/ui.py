@@ -459,11 +459,13 @@ def create_ui():
                     i2i_steps = gr.Slider(label="Inference Steps", minimum=1, maximum=50, value=25, step=1)
                     i2i_guidance = gr.Slider(label="Guidance Scale", minimum=0, maximum=10, value=2.5, step=0.1)
                     i2i_model_select = gr.Dropdown(
-                        choices=[const.LOCAL_MODEL, "Pro (Black Forest Labs)", "Pro (GRS AI)"], 
+                        choices=[const.LOCAL_MODEL, "Pro (Black Forest Labs)", "Pro (GRS AI)", const.PRO_AUTO_MODEL], 
                         label="🤖 Model Selection", 
                         value="Pro (GRS AI)",
-                        info="Choose between local processing or Pro API providers"
+                        info="Choose between local processing or Pro API providers - Auto picks the fastest provider you have a key for"
                     )
+                    local_status = gr.Markdown("", visible=False)  # Local model warm-up progress
+                    local_status_timer = gr.Timer(2.0, active=False)
 
                 i2i_generate_btn = gr.Button("🚀 Generate", variant="primary", visible=True, size="lg")
 
@@ -495,6 +497,7 @@ def create_ui():
         "i2i_steps": i2i_steps,
         "i2i_guidance": i2i_guidance, 
         "i2i_model_select": i2i_model_select, 
+        "local_status": local_status, "local_status_timer": local_status_timer,
         "i2i_generate_btn": i2i_generate_btn,
 
         "i2i_canvas_image_state": i2i_canvas_image_state, "i2i_object_image_state": i2i_object_image_state,
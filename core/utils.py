@@ -1,7 +1,168 @@
 from PIL import Image
+import numpy as np
+import hashlib
 import re
 import math
 import logging
+import os
+import threading
+import weakref
+from core import compositing
+from core.byte_lru import ByteBudgetLRU
+from core.compositing import Tile
+
+_fingerprint_memo = {}  # id(PIL image) -> (weakref, fingerprint), so one image object is hashed once
+_fingerprint_lock = threading.Lock()
+
+# id(reduced upload) -> (weakref, source path, original size). A side table rather than img.info, which
+# Pillow copies onto every resize/convert/crop/copy - derived images must not claim the upload's source
+_ingest_sources = {}
+_ingest_lock = threading.Lock()
+
+# Process-wide LRU of resized images, keyed by (fingerprint, size, filter); sized by configure_resize_cache
+_resize_cache = ByteBudgetLRU(256 * 1024 * 1024, name="resized images")
+
+# A reduced upload may be this much smaller than the size it is used at (4032 px decodes at 2016 for a
+# 2048 px generation); resizing up by a few percent is invisible, reopening the full file is not free
+INGEST_UPSCALE_TOLERANCE = 0.05
+
+# Pixel budget and resize threads of multi-image reference sheets; set by configure_reference_sheet
+_reference_sheet = {'megapixels': 4.0, 'workers': 4}
+
+def image_fingerprint(img):
+    """Content hash of a PIL image or numpy array - identical pixels give identical fingerprints."""
+    if not isinstance(img, np.ndarray):
+        with _fingerprint_lock:
+            memo = _fingerprint_memo.get(id(img))
+        if memo is not None and memo[0]() is img:
+            return memo[1]
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(img, np.ndarray):
+        digest.update(f"ndarray|{img.dtype}|{img.shape}".encode())
+        digest.update(np.ascontiguousarray(img).tobytes())
+        return digest.hexdigest()
+    digest.update(f"{img.mode}|{img.size}".encode())
+    digest.update(img.tobytes())
+    fingerprint = digest.hexdigest()
+    key = id(img)
+    # PIL images are treated as immutable once fingerprinted; the entry goes away with the image
+    ref = weakref.ref(img, lambda _, key=key: _forget_fingerprint(key))
+    with _fingerprint_lock:
+        _fingerprint_memo[key] = (ref, fingerprint)
+    return fingerprint
+
+def _forget_fingerprint(key):
+    with _fingerprint_lock:
+        memo = _fingerprint_memo.get(key)
+        if memo is not None and memo[0]() is None:
+            del _fingerprint_memo[key]
+
+def configure_resize_cache(config):
+    """Apply the resize_cache section of config.yaml to the process-wide resize cache"""
+    resize_config = config.get('resize_cache', {}) or {}
+    _resize_cache.max_bytes = int(float(resize_config.get('cache_size_mb', 256)) * 1024 * 1024)
+    if not _resize_cache.enabled:
+        _resize_cache.clear()
+
+def configure_reference_sheet(config):
+    """Apply the reference_sheet section of config.yaml to merge_multiple_images_high_quality"""
+    sheet_config = config.get('reference_sheet', {}) or {}
+    _reference_sheet['megapixels'] = float(sheet_config.get('megapixels', 4.0))
+    _reference_sheet['workers'] = max(1, int(sheet_config.get('workers', 4)))
+
+def cached_resize(img, size, resample=Image.LANCZOS):
+    """img.resize(size, resample), memoized by content - the result is shared, treat it as read-only"""
+    size = (int(size[0]), int(size[1]))
+    if img.size == size:
+        return img
+    if not _resize_cache.enabled:
+        return img.resize(size, resample)
+    key = (image_fingerprint(img), size, int(resample))
+    resized = _resize_cache.get(key)
+    if resized is None:
+        resized = img.resize(size, resample)
+        _resize_cache.put(key, resized, size[0] * size[1] * len(resized.getbands()))
+    return resized
+
+def open_for_editing(path, max_side=2048):
+    """Open an upload decoded near the working resolution max_side (the generation cap).
+
+    The long side is kept within INGEST_UPSCALE_TOLERANCE of max_side or above, so a 4032×3024
+    photo decodes at 2016×1512 and a 2048 px generation still uses the reduced pixels.
+
+    JPEGs use draft mode so the decoder itself scales by 1/2, 1/4 or 1/8; other formats are
+    decoded and shrunk with Image.reduce. The source path and original size are remembered for
+    this image object only, so full_resolution() can reopen the file if the full pixels are needed.
+    """
+    img = Image.open(path)
+    original_size = img.size
+    factor = int(max(original_size) // (max_side * (1 - INGEST_UPSCALE_TOLERANCE))) if max_side else 0
+    if factor >= 2:
+        if img.format == 'JPEG':
+            img.draft(None, (max(1, original_size[0] // factor), max(1, original_size[1] // factor)))
+            img.load()
+        else:
+            img.load()
+            if img.mode in ('L', 'LA', 'RGB', 'RGBA', 'CMYK'):  # Palette/bilevel images cannot be reduced
+                reduced = img.reduce(factor)
+                reduced.info = dict(img.info)
+                img = reduced
+    else:
+        img.load()
+    if img.size == original_size:
+        return img
+    logging.info(f"📉 Decoded {os.path.basename(path)} at {img.size[0]}×{img.size[1]} (original {original_size[0]}×{original_size[1]})")
+    key = id(img)
+    ref = weakref.ref(img, lambda _, key=key: _forget_ingest_source(key))
+    with _ingest_lock:
+        _ingest_sources[key] = (ref, path, original_size)
+    return img
+
+def _forget_ingest_source(key):
+    with _ingest_lock:
+        entry = _ingest_sources.get(key)
+        if entry is not None and entry[0]() is None:
+            del _ingest_sources[key]
+
+def _ingest_source(img):
+    """(source path, original size) of a reduced upload, or None for any other image (including its derivatives)"""
+    with _ingest_lock:
+        entry = _ingest_sources.get(id(img))
+    if entry is None or entry[0]() is not img:
+        return None
+    return entry[1], entry[2]
+
+def original_size(img):
+    """Size of the uploaded file behind img (its own size when it was not reduced on ingest)"""
+    source = _ingest_source(img)
+    return tuple(source[1]) if source is not None else img.size
+
+def full_resolution(img):
+    """The full-resolution image behind a reduced upload, decoded on demand (img itself otherwise)"""
+    source = _ingest_source(img)
+    if source is None:
+        return img
+    source_path, size = source
+    key = ('full', source_path, size)
+    full = _resize_cache.get(key)
+    if full is None:
+        try:
+            full = Image.open(source_path)
+            full.load()
+        except OSError as e:
+            logging.warning(f"⚠️ Full-resolution source unavailable ({e}) - using the reduced upload")
+            return img
+        full.info.update(img.info)
+        logging.info(f"🔍 Loaded full-resolution source {full.size[0]}×{full.size[1]}")
+        _resize_cache.put(key, full, full.size[0] * full.size[1] * len(full.getbands()))
+    return full
+
+def source_for_size(img, size):
+    """img, or its full-resolution source when the reduced upload is noticeably smaller than size"""
+    slack = 1 - INGEST_UPSCALE_TOLERANCE
+    if img.size[0] >= size[0] * slack and img.size[1] >= size[1] * slack:
+        return img
+    return full_resolution(img)
 
 def merge_images_with_smart_scaling(background_img, object_img, target_size=None, preserve_object_scale=False):
     """
@@ -23,12 +184,7 @@ def merge_images_with_smart_scaling(background_img, object_img, target_size=None
         target_size = background_img.size
     target_width, target_height = target_size
     
-    # Scale background to target size
-    if background_img.size != target_size:
-        background_scaled = background_img.resize(target_size, Image.LANCZOS)
-    else:
-        background_scaled = background_img
-    
+    # Background is scaled to target size by the compositor (only when it differs)
     # Enhanced object scaling to better preserve size for human placement
     bg_area = target_width * target_height
     obj_area = object_img.width * object_img.height
@@ -103,15 +259,13 @@ def merge_images_with_smart_scaling(background_img, object_img, target_size=None
         else:
             new_obj_height = int(new_obj_width / obj_aspect_ratio)
     
-    object_scaled = object_img.resize((new_obj_width, new_obj_height), Image.LANCZOS)
-    
     # DETAILED MERGING DEBUG LOGGING
     logging.info(f"🖼️ === IMAGE MERGING DEBUG ===")
     logging.info(f"🖼️ Original Background: {background_img.size}")
     logging.info(f"🖼️ Original Object: {object_img.size}")
     logging.info(f"🖼️ Target Size: {target_size}")
-    logging.info(f"🖼️ Background Scaled: {background_scaled.size}")
-    logging.info(f"🖼️ Object Scaled: {object_scaled.size}")
+    logging.info(f"🖼️ Background Scaled: {(target_width, target_height)}")
+    logging.info(f"🖼️ Object Scaled: {(new_obj_width, new_obj_height)}")
     logging.info(f"🖼️ Scale Factor Applied: {scale_factor:.3f}" if 'scale_factor' in locals() else "🖼️ No scale factor available")
     logging.info(f"🖼️ Preserve Object Scale: {preserve_object_scale}")
     
@@ -125,14 +279,12 @@ def merge_images_with_smart_scaling(background_img, object_img, target_size=None
     logging.info(f"🖼️ Final Merged Size: {merged_width}×{merged_height}")
     logging.info(f"🖼️ Compactness Ratio: {merged_width/target_width:.2f}x width (closer = better for FLUX Kontext)")
     
-    merged_image = Image.new('RGB', (merged_width, merged_height), color='white')
-    
-    # Paste background on the left
-    merged_image.paste(background_scaled, (0, 0))
-    
-    # Paste object on the right with small gap, vertically centered
+    # Background on the left, object on the right with small gap, vertically centered
     obj_y_offset = max(0, (merged_height - new_obj_height) // 2)
-    merged_image.paste(object_scaled, (target_width + gap, obj_y_offset))
+    merged_image = compositing.compose((merged_width, merged_height), [
+        Tile(background_img, (0, 0, target_width, target_height)),
+        Tile(object_img, (target_width + gap, obj_y_offset, new_obj_width, new_obj_height)),
+    ], background='white', resize=cached_resize)
     
     logging.info(f"🖼️ Background Position: (0, 0)")
     logging.info(f"🖼️ Object Position: ({target_width + gap}, {obj_y_offset})")
@@ -140,51 +292,23 @@ def merge_images_with_smart_scaling(background_img, object_img, target_size=None
     
     return merged_image
 
-def merge_multiple_images_high_quality(image_list, bg_color="black"):
+def merge_multiple_images_high_quality(image_list, bg_color="black", max_megapixels=None, workers=None):
     """
-    Merges images. If 4 images are provided, they are arranged in a 2x2 grid.
-    Otherwise, they are merged side-by-side horizontally.
+    Packs images into one reference sheet of at most max_megapixels.
+    Images keep their order and aspect ratio in justified rows that fill the canvas
+    (compositing.pack_rows); the tile resizes run on a thread pool of workers threads.
+    Both default to the reference_sheet section of config.yaml.
     """
+    max_megapixels = max_megapixels or _reference_sheet['megapixels']
+    workers = workers or _reference_sheet['workers']
     if not image_list:
         return None
     if len(image_list) == 1:
         return image_list[0]
 
-    resampling_filter = Image.Resampling.LANCZOS
-
-    # --- 2x2 Grid Logic for exactly 4 images ---
-    if len(image_list) == 4:
-        cell_width = max(img.width for img in image_list)
-        cell_height = max(img.height for img in image_list)
-        resized_images = [
-            img.resize((cell_width, cell_height), resample=resampling_filter)
-            for img in image_list
-        ]
-        grid_image = Image.new('RGB', (cell_width * 2, cell_height * 2), color=bg_color)
-        grid_image.paste(resized_images[0], (0, 0))
-        grid_image.paste(resized_images[1], (cell_width, 0))
-        grid_image.paste(resized_images[2], (0, cell_height))
-        grid_image.paste(resized_images[3], (cell_width, cell_height))
-        return grid_image
-
-    # --- Fallback: Original horizontal merging logic for other counts ---
-    max_height = max(img.height for img in image_list)
-    scaled_images = []
-    for img in image_list:
-        if img.height != max_height:
-            scale_factor = max_height / img.height
-            new_width = int(img.width * scale_factor)
-            scaled_images.append(img.resize((new_width, max_height), resample=resampling_filter))
-        else:
-            scaled_images.append(img)
-
-    total_width = sum(img.width for img in scaled_images)
-    merged_image = Image.new('RGB', (total_width, max_height), color=bg_color)
-    x_offset = 0
-    for img in scaled_images:
-        merged_image.paste(img, (x_offset, 0))
-        x_offset += img.width
-    return merged_image
+    size, boxes = compositing.pack_rows([img.size for img in image_list], max_megapixels * 1_000_000)
+    tiles = [Tile(img, box) for img, box in zip(image_list, boxes)]
+    return compositing.compose(size, tiles, background=bg_color, resize=cached_resize, workers=workers)
 
 def get_dimensions(aspect_ratio_str: str, base_resolution: int = 1024):
     """Calculates width and height from an aspect ratio string, keeping the longest side at base_resolution.
@@ -238,16 +362,9 @@ def parse_template(template):
 
 def paste_object(background_img, object_img, target_position=None):
     """Pastes an object image onto a background with smart positioning and blending."""
-    if background_img.mode != 'RGBA':
-        background_img = background_img.convert("RGBA")
-    if object_img.mode != 'RGBA':
-        object_img = object_img.convert("RGBA")
-
     bg_w, bg_h = background_img.size
     obj_w, obj_h = object_img.size
     
-    composite = background_img.copy()
-    
     if target_position:
         # Center the object at the target position
         target_x, target_y = target_position
@@ -259,13 +376,10 @@ def paste_object(background_img, object_img, target_position=None):
         offset = ((bg_w - obj_w) // 2, (bg_h - obj_h) // 2)
     
     # Use the object's alpha channel for clean compositing
-    if object_img.mode == 'RGBA':
-        alpha_mask = object_img.getchannel('A')
-        composite.paste(object_img, offset, alpha_mask)
-    else:
-        composite.paste(object_img, offset)
-    
-    return composite.convert("RGB")
+    return compositing.compose((bg_w, bg_h), [
+        Tile(background_img, (0, 0, bg_w, bg_h)),
+        Tile(object_img, (offset[0], offset[1], obj_w, obj_h), blend=True),
+    ])
 
 def create_side_by_side_display(background_img, object_img):
     """
@@ -295,16 +409,11 @@ def create_side_by_side_display(background_img, object_img):
     bg_target_width = int((bg_width * target_height) / bg_height)
     obj_target_width = int((obj_width * target_height) / obj_height)
     
-    # Resize images to target height while maintaining aspect ratio
-    bg_resized = background_img.resize((bg_target_width, target_height), Image.LANCZOS)
-    obj_resized = object_img.resize((obj_target_width, target_height), Image.LANCZOS)
-    
-    # Create the combined image
+    # Background on left, object on right, both resized to target height (aspect ratio kept)
     total_width = bg_target_width + obj_target_width
-    combined = Image.new('RGB', (total_width, target_height), color='white')
-    
-    # Paste background on left, object on right
-    combined.paste(bg_resized, (0, 0))
-    combined.paste(obj_resized, (bg_target_width, 0))
+    combined = compositing.compose((total_width, target_height), [
+        Tile(background_img, (0, 0, bg_target_width, target_height)),
+        Tile(object_img, (bg_target_width, 0, obj_target_width, target_height)),
+    ], background='white', resize=cached_resize)
     
     return combined
\ No newline at end of file
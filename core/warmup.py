@@ -0,0 +1,118 @@
+"""
+Pipeline Warm-up - Loads the configured local pipelines in the background at startup
+Reports per-pipeline progress for the UI indicator and the /local-status endpoint, and lets
+Local requests that arrive early wait for the warm-up instead of starting a second load.
+The endpoint also carries the pipeline manager's load/evict metrics
+"""
+import logging
+import threading
+import time
+
+WARMUP_STATUS_ROUTE = "/local-status"
+
+_STATE_LABELS = {
+    'pending': "⏳ queued",
+    'loading': "🔄 loading",
+    'ready': "✅ ready",
+    'failed': "❌ failed",
+}
+
+
+class PipelineWarmup:
+    """Background loader for local pipelines; load_pipeline(kind) returns the pipeline or None"""
+
+    def __init__(self, load_pipeline, config, metrics=None):
+        warmup_config = config.get('local_warmup', {}) or {}
+        self.enabled = bool(warmup_config.get('enabled', False))
+        self.kinds = list(warmup_config.get('pipelines', ['i2i']))
+        self._load_pipeline = load_pipeline
+        self._metrics = metrics  # Optional callable returning pipeline cache metrics
+        self._states = {kind: {'state': 'pending', 'started_at': None, 'seconds': None, 'error': None} for kind in self.kinds}
+        self._done = {kind: threading.Event() for kind in self.kinds}
+        self._thread = None
+
+    def start(self):
+        """Start loading in a daemon thread (no-op unless local_warmup.enabled)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="pipeline-warmup", daemon=True)
+        self._thread.start()
+        logging.info(f"🔥 Local pipeline warm-up started: {', '.join(self.kinds)}")
+
+    def _run(self):
+        for kind in self.kinds:
+            state = self._states[kind]
+            state.update(state='loading', started_at=time.monotonic())
+            try:
+                pipeline = self._load_pipeline(kind)
+                if pipeline is None:
+                    raise RuntimeError("local processing is not available on this machine")
+                state['state'] = 'ready'
+                logging.info(f"🔥 Warm-up: {kind} pipeline ready after {time.monotonic() - state['started_at']:.1f}s")
+            except Exception as e:
+                state.update(state='failed', error=str(e))
+                logging.warning(f"🔥 Warm-up: {kind} pipeline failed to load: {e}")
+            finally:
+                state['seconds'] = time.monotonic() - state['started_at']
+                self._done[kind].set()
+
+    @property
+    def finished(self):
+        return all(event.is_set() for event in self._done.values())
+
+    def is_warming(self, kind):
+        return self._thread is not None and kind in self._done and not self._done[kind].is_set()
+
+    def wait_until_ready(self, kind, progress=None, cancel_token=None):
+        """Block a Local request until the warm-up of its pipeline has finished (or failed)"""
+        if not self.is_warming(kind):
+            return
+        logging.info(f"🔥 Local {kind} request waiting for the warm-up to finish")
+        waited_from = time.monotonic()
+        while not self._done[kind].wait(timeout=0.5):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            if progress is not None:
+                progress(0, desc=f"Local model is still warming up ({time.monotonic() - waited_from:.0f}s)...")
+
+    def status(self):
+        """Warm-up state per pipeline, served at /local-status"""
+        now = time.monotonic()
+        pipelines = {}
+        for kind, state in self._states.items():
+            seconds = state['seconds']
+            if seconds is None and state['started_at'] is not None:
+                seconds = now - state['started_at']
+            pipelines[kind] = {'state': state['state'], 'seconds': round(seconds, 1) if seconds is not None else None, 'error': state['error']}
+        status = {
+            'enabled': self.enabled,
+            'ready': self.enabled and all(p['state'] == 'ready' for p in pipelines.values()),
+            'pipelines': pipelines,
+        }
+        if self._metrics is not None:
+            status['pipeline_manager'] = self._metrics()
+        return status
+
+    def status_markdown(self):
+        status = self.status()
+        if not status['enabled']:
+            return ""
+        parts = []
+        for kind, pipeline in status['pipelines'].items():
+            label = f"{kind.upper()} {_STATE_LABELS[pipeline['state']]}"
+            if pipeline['state'] == 'loading' and pipeline['seconds'] is not None:
+                label += f" ({pipeline['seconds']:.0f}s)"
+            parts.append(label)
+        return f"**Local models:** {' · '.join(parts)}"
+
+    def create_router(self):
+        """FastAPI router exposing the warm-up status and pipeline metrics for health checks"""
+        from fastapi import APIRouter
+
+        router = APIRouter()
+
+        @router.get(WARMUP_STATUS_ROUTE)
+        async def local_status():
+            return self.status()
+
+        return router
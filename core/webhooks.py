@@ -0,0 +1,70 @@
+"""
+Webhook Receiver - Opt-in completion callbacks for Flux-compatible Pro API jobs
+Each submitted job gets an unguessable callback URL on the app's own server; when the
+provider calls it the waiting generation resumes immediately instead of waiting on polls
+"""
+import logging
+import secrets
+import threading
+from concurrent.futures import Future
+
+from fastapi import APIRouter, HTTPException, Request
+
+WEBHOOK_ROUTE = "/pro-webhook"
+
+
+class WebhookReceiver:
+    """Hands out per-job callback URLs and resolves the matching job when a callback arrives"""
+
+    def __init__(self, config):
+        webhook_config = config.get('pro_webhooks', {}) or {}
+        self.enabled = bool(webhook_config.get('enabled', False))
+        self.public_url = (webhook_config.get('public_url') or "").rstrip('/')
+        self.fallback_after = float(webhook_config.get('fallback_after', 30))
+        self._pending = {}  # token -> Future resolved with the callback body
+        self._lock = threading.Lock()
+
+        if self.enabled and not self.public_url:
+            logging.warning("⚠️ pro_webhooks.enabled is set but public_url is empty - falling back to polling")
+            self.enabled = False
+
+    def expect(self):
+        """Create a callback slot for a new job; returns (token, callback_url, future)"""
+        token = secrets.token_urlsafe(24)
+        future = Future()
+        with self._lock:
+            self._pending[token] = future
+        return token, f"{self.public_url}{WEBHOOK_ROUTE}/{token}", future
+
+    def discard(self, token):
+        """Forget a job's callback slot once the job has finished either way"""
+        with self._lock:
+            future = self._pending.pop(token, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def deliver(self, token, body):
+        """Resolve the job waiting on this token; returns False for unknown tokens"""
+        with self._lock:
+            future = self._pending.get(token)
+        if future is None or future.done():
+            return False
+        future.set_result(body)
+        return True
+
+    def create_router(self):
+        """FastAPI routes to mount on the app's server"""
+        router = APIRouter()
+
+        @router.post(f"{WEBHOOK_ROUTE}/{{token}}")
+        async def receive_callback(token: str, request: Request):
+            try:
+                body = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Expected a JSON body")
+            if not self.deliver(token, body):
+                raise HTTPException(status_code=404, detail="Unknown or expired job")
+            logging.info(f"📬 Webhook callback received (status: {body.get('status', 'unknown')})")
+            return {"received": True}
+
+        return router
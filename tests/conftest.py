@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def config(tmp_path):
+    """The app's config.yaml with every on-disk cache redirected to a temporary directory"""
+    with open(os.path.join(ROOT, 'config.yaml')) as f:
+        config = yaml.safe_load(f)
+    config['result_cache'] = {'enabled': False, 'directory': str(tmp_path / 'results')}
+    config['job_journal'] = {'enabled': False, 'path': str(tmp_path / 'jobs.sqlite3'), 'results_dir': str(tmp_path / 'recovered')}
+    config['tiled_output'] = {'enabled': False, 'directory': str(tmp_path / 'large_outputs')}
+    return config
@@ -0,0 +1,134 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.batch_scheduler import BatchRequest
+from core.cancellation import CancelToken, GenerationCancelled
+from core.generator import Generator
+
+
+class StubResult:
+    def __init__(self, images):
+        self.images = images
+
+
+class StubPipeline:
+    """Records each call and returns one '<prompt>#<n>' string per image"""
+    memory_bytes = 1024
+
+    def __init__(self, seconds=0.0):
+        self.calls = []
+        self.seconds = seconds
+
+    def __call__(self, prompt, num_images_per_prompt, **kwargs):
+        self.calls.append(dict(kwargs, prompt=prompt, num_images_per_prompt=num_images_per_prompt))
+        time.sleep(self.seconds)
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        return StubResult([f"{p}#{i}" for p in prompts for i in range(num_images_per_prompt)])
+
+
+@pytest.fixture
+def make_generator(config):
+    def make(seconds=0.0):
+        config['local_batching'] = {'enabled': True, 'window_ms': 300, 'max_batch_images': 4}
+        pipeline = StubPipeline(seconds)
+        generator = Generator(config, pipeline_loaders={'t2i': lambda shared=None: pipeline, 'i2i': lambda shared=None: None})
+        return generator, pipeline
+    return make
+
+
+def submit_together(generator, submissions, stagger=0.0, finished_at=None):
+    """Submit (key, request) pairs from concurrent threads; returns each result or raised exception
+
+    With stagger, the i-th submission waits i * stagger seconds, so the first one leads the batch.
+    """
+    barrier = threading.Barrier(len(submissions))
+
+    def submit(index, key, request):
+        barrier.wait()
+        time.sleep(index * stagger)
+        try:
+            return generator.batch_scheduler.submit(key, request)
+        except Exception as e:
+            return e
+        finally:
+            if finished_at is not None:
+                finished_at[request.prompt] = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=len(submissions)) as pool:
+        return list(pool.map(lambda args: submit(*args), [(i, *pair) for i, pair in enumerate(submissions)]))
+
+
+def t2i_key(width=512, height=512, num_images=1):
+    return ('t2i', width, height, 28, 3.5, num_images)
+
+
+def test_compatible_requests_run_in_one_call(make_generator):
+    generator, pipeline = make_generator()
+
+    results = submit_together(generator, [(t2i_key(), BatchRequest(prompt, 1)) for prompt in ('a', 'b', 'c')])
+
+    assert len(pipeline.calls) == 1
+    assert sorted(pipeline.calls[0]['prompt']) == ['a', 'b', 'c']
+    assert sorted(results) == [['a#0'], ['b#0'], ['c#0']]
+
+
+def test_incompatible_size_runs_alone(make_generator):
+    generator, pipeline = make_generator()
+
+    results = submit_together(generator, [
+        (t2i_key(), BatchRequest('a', 1)),
+        (t2i_key(), BatchRequest('b', 1)),
+        (t2i_key(width=768), BatchRequest('wide', 1)),
+    ])
+
+    assert len(pipeline.calls) == 2
+    alone = next(call for call in pipeline.calls if call['width'] == 768)
+    assert alone['prompt'] == 'wide'
+    assert results[2] == ['wide#0']
+    assert sorted(results[:2]) == [['a#0'], ['b#0']]
+
+
+def test_each_request_gets_its_own_slice(make_generator):
+    generator, pipeline = make_generator()
+
+    results = submit_together(generator, [(t2i_key(num_images=2), BatchRequest(prompt, 2)) for prompt in ('a', 'b')])
+
+    assert len(pipeline.calls) == 1
+    assert pipeline.calls[0]['num_images_per_prompt'] == 2
+    assert sorted(results) == [['a#0', 'a#1'], ['b#0', 'b#1']]
+
+
+def test_cancelled_member_stops_waiting_while_the_batch_finishes(make_generator):
+    generator, pipeline = make_generator(seconds=1.5)
+    token = CancelToken()
+    threading.Timer(0.5, token.cancel, args=("cleared",)).start()
+
+    finished_at = {}
+    results = submit_together(generator, [
+        (t2i_key(), BatchRequest('kept', 1, cancel_token=CancelToken())),
+        (t2i_key(), BatchRequest('cancelled', 1, cancel_token=token)),
+    ], stagger=0.05, finished_at=finished_at)
+
+    assert len(pipeline.calls) == 1
+    assert results[0] == ['kept#0']
+    assert isinstance(results[1], GenerationCancelled)
+    # The cancelled member is released before the batch it joined finishes (the leader runs the call)
+    assert finished_at['kept'] - finished_at['cancelled'] > 0.5
+    assert generator.pipeline_manager.metrics()['leases'] == {'t2i': 0, 'i2i': 0}
+
+
+def test_seeded_request_gets_the_same_generators_alone_or_batched(make_generator):
+    generator, pipeline = make_generator()
+    generator._seeded_generator = lambda seed: ('generator', seed)  # Stands in for torch.Generator(...).manual_seed(seed)
+
+    generator.batch_scheduler.submit(t2i_key(num_images=2), BatchRequest('a', 2, seed=7))
+    submit_together(generator, [(t2i_key(num_images=2), BatchRequest(prompt, 2, seed=seed)) for prompt, seed in (('a', 7), ('b', 100))], stagger=0.05)
+
+    alone, batched = pipeline.calls
+    assert alone['generator'] == [('generator', 7), ('generator', 8)]
+    assert batched['prompt'] == ['a', 'b']
+    assert batched['generator'][:2] == alone['generator']
+    assert batched['generator'][2:] == [('generator', 100), ('generator', 101)]
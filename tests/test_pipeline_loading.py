@@ -0,0 +1,54 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.generator import Generator
+
+
+class StubPipeline:
+    memory_bytes = 1024
+
+
+def make_generator(config, load_seconds=0.3):
+    loads = []
+
+    def loader(kind):
+        def load(shared=None):
+            loads.append(kind)
+            time.sleep(load_seconds)
+            return StubPipeline()
+        return load
+
+    generator = Generator(config, pipeline_loaders={'t2i': loader('t2i'), 'i2i': loader('i2i')})
+    return generator, loads
+
+
+def test_concurrent_loads_share_one_load(config):
+    generator, loads = make_generator(config)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        pipelines = list(pool.map(lambda _: generator._load_local_pipeline('t2i'), range(8)))
+
+    assert loads == ['t2i']
+    assert all(pipeline is pipelines[0] for pipeline in pipelines)
+    metrics = generator.pipeline_manager.metrics()
+    assert metrics['loads'] == 1
+    assert metrics['leases'] == {'t2i': 0, 'i2i': 0}
+
+
+def test_concurrent_leases_load_once_and_release(config):
+    generator, loads = make_generator(config)
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        with generator._pipeline_lease('i2i') as pipeline:
+            return pipeline
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pipelines = list(pool.map(lambda _: run(), range(4)))
+
+    assert loads == ['i2i']
+    assert all(pipeline is pipelines[0] for pipeline in pipelines)
+    assert generator.pipeline_manager.metrics()['leases'] == {'t2i': 0, 'i2i': 0}
+    assert generator.unload_local_pipeline('i2i')
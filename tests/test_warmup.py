@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core import constants as const
+from core.generator import Generator
+from core.warmup import WARMUP_STATUS_ROUTE
+
+
+class StubResult:
+    def __init__(self, images):
+        self.images = images
+
+
+class StubPipeline:
+    memory_bytes = 1024
+
+    def __call__(self, prompt, num_images_per_prompt, **kwargs):
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        return StubResult([f"{p}#{i}" for p in prompts for i in range(num_images_per_prompt)])
+
+
+def make_generator(config, load):
+    config['local_warmup'] = {'enabled': True, 'pipelines': ['t2i']}
+    generator = Generator(config, pipeline_loaders={'t2i': load, 'i2i': lambda shared=None: None})
+    client = TestClient(FastAPI())
+    client.app.include_router(generator.warmup.create_router())
+    return generator, client
+
+
+def local_request(generator):
+    return asyncio.run(generator.text_to_image("a chair", 4, 3.5, const.LOCAL_MODEL, 1, 512, 512, progress=None))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_status_reports_loading_then_ready(config):
+    release = threading.Event()
+
+    def load(shared=None):
+        release.wait(5)
+        return StubPipeline()
+
+    generator, client = make_generator(config, load)
+    generator.warmup.start()
+
+    wait_for(lambda: client.get(WARMUP_STATUS_ROUTE).json()['pipelines']['t2i']['state'] == 'loading')
+    assert client.get(WARMUP_STATUS_ROUTE).json()['ready'] is False
+    release.set()
+    wait_for(lambda: client.get(WARMUP_STATUS_ROUTE).json()['ready'])
+    status = client.get(WARMUP_STATUS_ROUTE).json()
+    assert status['pipelines']['t2i']['state'] == 'ready'
+    assert status['pipeline_manager']['loads'] == 1
+
+
+def test_local_request_during_loading_waits_then_completes(config):
+    loads = []
+
+    def load(shared=None):
+        loads.append(time.monotonic())
+        time.sleep(1.0)
+        return StubPipeline()
+
+    generator, client = make_generator(config, load)
+    generator.warmup.start()
+    wait_for(lambda: generator.warmup.is_warming('t2i') and loads)
+
+    images = local_request(generator)
+
+    assert images == ["a chair#0"]
+    assert time.monotonic() - loads[0] >= 1.0  # Returned only after the warm-up load finished
+    assert generator.warmup.finished
+    assert len(loads) == 1  # The request used the warm-up's pipeline instead of starting a second load
+
+
+def test_loader_failure_is_reported(config):
+    def load(shared=None):
+        raise RuntimeError("CUDA out of memory")
+
+    generator, client = make_generator(config, load)
+    generator.warmup.start()
+
+    wait_for(lambda: generator.warmup.finished)
+    status = client.get(WARMUP_STATUS_ROUTE).json()
+    assert status['ready'] is False
+    assert status['pipelines']['t2i']['state'] == 'failed'
+    assert "CUDA out of memory" in status['pipelines']['t2i']['error']
+    with pytest.raises(RuntimeError, match="CUDA out of memory"):
+        local_request(generator)